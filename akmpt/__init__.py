@@ -0,0 +1 @@
+VERSION = '0.2.0'
@@ -1,8 +1,13 @@
 import sys
 
+from akmpt.batch import expand_files, run_batch
 from akmpt.kmp import Kmp
+from akmpt.lib.profiling import profiling
 
 from akmpt.cmon.cmdline import run_cmds, ArgRunner
+from akmpt.lib.autofix import AutoFix
+from akmpt.lib.binfile import BinFile
+from akmpt.lib.unpacking.structure import KmpStructure
 from akmpt.reverse import reverse_kmp, reverse_route
 
 
@@ -11,40 +16,73 @@ def create_slice(mystring):
 
 
 class GenericRunner(ArgRunner):
-    named_args = ('destination',)
-    named_shortcuts = ('d',)
-    flags = ('overwrite',)
+    named_args = ('destination', 'jobs', 'profile_out')
+    named_shortcuts = ('d', 'j')
+    flags = ('overwrite', 'fsync', 'profile')
     flag_shortcuts = ('o',)
     positional_args = ('filename',)
     default = 'destination'
+    jobs_default = 1
 
     def run(self):
+        files = expand_files(self.filename) if self.filename != '-' else None
+        if files is None:
+            return self.run_file()
+        if not files:
+            AutoFix.error('No kmp files found for {}', 1, self.filename)
+            return False
+        return run_batch(self, files, int(self.jobs)) == 0
+
+    def run_file(self):
+        if not self.profile and not self.profile_out:
+            return self.process_file()
+        with profiling(self.profile_out) as profiler:
+            result = self.process_file()
+        AutoFix.info(lambda: 'Profile of {}:\n{}'.format(self.filename, profiler.format()), 0)
+        if self.profile_out:
+            AutoFix.info('Wrote pstats {}', 0, self.profile_out)
+        return result
+
+    def process_file(self):
         if not self.destination:
             self.destination = self.filename
-        self.kmp = Kmp(self.filename)
+        if self.destination == '-':     # keep stdout for the kmp data
+            AutoFix.set_stream(sys.stderr)
+        if self.filename == '-':
+            self.kmp = Kmp.from_bytes(sys.stdin.buffer.read())
+        else:
+            self.kmp = Kmp(self.filename)
+        if self.process() is False:
+            return False
+        return self.save()
+
+    def process(self):
+        raise NotImplementedError()
 
     def save(self):
-        return self.kmp.save(self.destination, self.overwrite)
+        if self.destination == '-':
+            sys.stdout.buffer.write(self.kmp.to_buffer())
+            sys.stdout.flush()
+            return True
+        return self.kmp.save(self.destination, self.overwrite, fsync=self.fsync)
 
 
 class ReverseRunner(GenericRunner):
     cmd = 'reverse'
-    named_args = ('destination', 'route')
+    named_args = ('destination', 'jobs', 'profile_out', 'route')
     help_string = 'Reverses the checkpoints, item routes, cpu routes, and rotates respawns and start positions 180\n' \
                   '\t\tSpecify route=<route_index> to reverse a route instead'
 
-    def run(self):
-        super().run()
+    def process(self):
         if self.route:
             reverse_route(self.kmp.routes[self.route])
         else:
             reverse_kmp(self.kmp)
-        return self.save()
 
 
 class RotateRunner(GenericRunner):
     cmd = 'rotate'
-    named_args = ('destination', 'group', 'item', 'rotation', 'direction')
+    named_args = ('destination', 'jobs', 'profile_out', 'group', 'item', 'rotation', 'direction')
     help_string = 'Rotates the kmp <group> [<item>] by rotation (default 180)'
     rotation_default = 180
     group_default = 'game_objects'
@@ -57,8 +95,7 @@ class RotateRunner(GenericRunner):
         else:
             group.rotation[self.direction_index] = (group.rotation[self.direction_index] + self.rotation) % 360
 
-    def run(self):
-        super().run()
+    def process(self):
         kmp = self.kmp
         self.direction_index = 'xyz'.index(self.direction)
         group = getattr(kmp, self.group)
@@ -69,17 +106,74 @@ class RotateRunner(GenericRunner):
                 self.slice = self.item
             if group is kmp.game_objects:
                 group = kmp
-            for x in group[self.slice]:
+            try:
+                items = group[self.slice]
+            except (KeyError, TypeError):
+                AutoFix.error('No {} {} in {}', 1, self.group, self.item, self.filename)
+                return False
+            for x in items:
                 self.rotate_group(x)
         else:
             for x in group:
                 self.rotate_group(x)
-        return self.save()
+
+
+class StructureRunner(ArgRunner):
+    named_args = ()
+    flags = ()
+    positional_args = ('filename',)
+
+    def run(self):
+        success = True
+        for filename in expand_files(self.filename) or [self.filename]:
+            try:
+                with BinFile(filename, memory_map=True) as binfile:
+                    structure = KmpStructure(binfile)
+            except OSError as e:
+                AutoFix.error(str(e))
+                success = False
+                continue
+            self.report(structure)
+            success = success and structure.is_valid
+        return success
+
+    def report(self, structure):
+        raise NotImplementedError()
+
+
+class CheckRunner(StructureRunner):
+    cmd = 'check'
+    help_string = 'Validates the kmp header, section table, and section sizes without unpacking'
+
+    def report(self, structure):
+        print('{} {}'.format('OK  ' if structure.is_valid else 'FAIL', structure.filename))
+        for x in structure.problems:
+            print('  error: ' + x)
+        for x in structure.warnings:
+            print('  warn: ' + x)
+
+
+class InfoRunner(CheckRunner):
+    cmd = 'info'
+    help_string = 'Lists the kmp sections with their offsets, sizes, and entry counts'
+
+    def report(self, structure):
+        print('{}: version {}, {:#x} bytes'.format(structure.filename,
+                                                    hex(structure.version) if structure.version else None,
+                                                    structure.size))
+        for x in structure.sections:
+            print('  {:4} offset {:#07x} size {:#07x} entries {:5} value {:#06x}'.format(
+                x.magic, x.offset, x.size, x.n_entries, x.additional_value))
+        if not structure.is_valid or structure.warnings:
+            super().report(structure)
 
 
 def main():
-    run_cmds(sys.argv[1:], 'Usage: (reverse|rotate) <kmp_file> [<destination>] [-o]',
-             (ReverseRunner, RotateRunner))
+    run_cmds(sys.argv[1:], 'Usage: (reverse|rotate|check|info) <kmp_file> [<destination>] [-o] [--jobs <n>]\n'
+                           '  Use - as <kmp_file> or <destination> to read stdin or write stdout\n'
+                           '  <kmp_file> may be a directory or glob, <destination> is then a directory\n'
+                           '  --profile times each section phase, --profile-out <file> also dumps cProfile stats',
+             (ReverseRunner, RotateRunner, CheckRunner, InfoRunner))
 
 
 if __name__ == '__main__':
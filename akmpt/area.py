@@ -2,13 +2,17 @@ from akmpt.base import Base
 
 
 class Area(Base):
+    __slots__ = ('shape', 'area_type', 'camera', 'priority', 'position', 'rotation', 'scale', 'settings', 'route',
+                 'enemy_point_id')
     MAGIC = 'AREA'
     FMT = '4B9f2H2BH'
     BYTE_LEN = 0x30
+    FIELDS = (('shape', 1), ('area_type', 1), ('camera', 1), ('priority', 1), ('position', 3), ('rotation', 3),
+              ('scale', 3), ('settings', 2), ('route', 1), ('enemy_point_id', 1), ('padding', 1))
 
     def __init__(self, shape=0, area_type=0, camera=None, priority=0,
                  position=None, rotation=None, scale=None,
-                 settings=None, route=None, enemy_point_id=-1):
+                 settings=None, route=None, enemy_point_id=0xff):
         self.priority = priority
         self.enemy_point_id = enemy_point_id
         self.settings = settings if settings else [0, 0]
@@ -1,17 +1,60 @@
+from array import array
+
+
+class Vector(array):
+    """Float vector stored unboxed, compares equal to any sequence of the same values"""
+    __slots__ = ()
+
+    def __new__(cls, values=(0, 0, 0)):
+        return super().__new__(cls, 'd', values)
+
+    def __eq__(self, other):
+        if isinstance(other, array):
+            return array.__eq__(self, other)
+        try:
+            return self.tolist() == list(other)
+        except TypeError:
+            return NotImplemented
+
+    def __ne__(self, other):
+        equal = self.__eq__(other)
+        return equal if equal is NotImplemented else not equal
+
+    __hash__ = None
+
+    def __reduce_ex__(self, protocol):
+        return type(self), (self.tolist(),)
+
+    def __repr__(self):
+        return repr(self.tolist())
+
+
+def remove_identical(items, x):
+    """Removes x itself from items, rather than the first item equal to it, raising ValueError if absent"""
+    for i in range(len(items)):
+        if items[i] is x:
+            del items[i]
+            return
+    raise ValueError('{} not in list'.format(type(x).__name__))
+
+
 class Base:
+    __slots__ = ('index',)
     FMT = None
     BYTE_LEN = None
     MAGIC = None
+    FIELDS = None   # (name, count) pairs laid out over FMT
 
     @staticmethod
     def init_3(args):
-        return [list(x) if x else [0, 0, 0] for x in args]
+        return [Vector(x) if x else Vector() for x in args]
 
     def __eq__(self, other):
         return other is not None and type(other) is type(self)
 
 
 class PointCollection(Base):
+    __slots__ = ('points',)
 
     def __init__(self, points=None):
         self.points = points if points is not None else []
@@ -33,8 +76,10 @@ class PointCollection(Base):
 
 
 class ConnectedPointCollection(PointCollection):
+    __slots__ = ('next_groups', 'prev_groups', 'settings')
     FMT = '16B'
     BYTE_LEN = 0x10
+    FIELDS = (('start', 1), ('length', 1), ('prev_groups', 6), ('next_groups', 6), ('settings', 2))
 
     def __init__(self, points=None, settings=None):
         super().__init__(points)
@@ -53,7 +98,7 @@ class ConnectedPointCollection(PointCollection):
     def set_next_groups(self, groups):
         for x in self.next_groups:
             try:
-                x.prev_groups.remove(self)
+                remove_identical(x.prev_groups, self)
             except ValueError:
                 pass
         self.next_groups = []
@@ -62,8 +107,8 @@ class ConnectedPointCollection(PointCollection):
     
     def remove_next_group(self, group):
         try:
-            self.next_groups.remove(group)
-            group.prev_groups.remove(self)
+            remove_identical(self.next_groups, group)
+            remove_identical(group.prev_groups, self)
         except ValueError:
             pass
 
@@ -73,15 +118,15 @@ class ConnectedPointCollection(PointCollection):
 
     def remove_prev_group(self, group):
         try:
-            self.prev_groups.remove(group)
-            group.next_groups.remove(self)
+            remove_identical(self.prev_groups, group)
+            remove_identical(group.next_groups, self)
         except ValueError:
             pass
     
     def set_prev_groups(self, groups):
         for x in self.prev_groups:
             try:
-                x.next_groups.remove(self)
+                remove_identical(x.next_groups, self)
             except ValueError:
                 pass
         self.prev_groups = []
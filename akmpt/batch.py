@@ -0,0 +1,90 @@
+"""Runs a command over many kmp files, optionally in parallel processes"""
+import glob
+import io
+import os
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from akmpt.lib.autofix import AutoFix
+
+
+def expand_files(pattern):
+    """Expands a directory (its .kmp files) or glob pattern, returns None for a single file"""
+    if os.path.isfile(pattern):     # names such as '[DS] course.kmp' are not patterns
+        return None
+    if os.path.isdir(pattern):
+        return sorted(os.path.join(pattern, x) for x in os.listdir(pattern) if x.lower().endswith('.kmp'))
+    if any(x in pattern for x in '*?['):
+        return sorted(glob.glob(pattern, recursive=True))
+    return None
+
+
+def run_job(runner_type, attributes):
+    """Runs a runner on one file in the current process, returns (filename, success, output)"""
+    stream = io.StringIO()
+    AutoFix.set_stream(stream)
+    runner = runner_type()
+    runner.__dict__.update(attributes)
+    try:
+        success = bool(runner.run_file())
+    except Exception:
+        AutoFix.flush()
+        stream.write(traceback.format_exc())
+        success = False
+    AutoFix.flush()
+    return runner.filename, success, stream.getvalue()
+
+
+def get_jobs(runner, files):
+    """Gets the runner attributes for each file, destination being a directory if given"""
+    names = [os.path.basename(x) for x in files]
+    if runner.destination and len(set(names)) != len(names):
+        raise ValueError('Duplicate file names can not be written to a single destination')
+    jobs = []
+    for filename, name in zip(files, names):
+        attributes = dict(vars(runner))
+        attributes['filename'] = filename
+        attributes['destination'] = os.path.join(runner.destination, name) if runner.destination else filename
+        jobs.append(attributes)
+    return jobs
+
+
+def run_batch(runner, files, jobs=1):
+    """Runs the runner over files with up to jobs processes (0 for one per cpu), printing each file's output.
+
+    Returns the number of failed files.
+    """
+    if runner.destination:
+        os.makedirs(runner.destination, exist_ok=True)
+    if not jobs:
+        jobs = os.cpu_count() or 1
+    runner_type = type(runner)
+    start = time.perf_counter()
+    failed = []
+    if jobs == 1:
+        stream = AutoFix.stream
+        try:
+            for x in get_jobs(runner, files):
+                _report(*run_job(runner_type, x), failed)
+        finally:
+            AutoFix.set_stream(stream)
+    else:
+        with ProcessPoolExecutor(min(jobs, len(files))) as executor:
+            futures = [executor.submit(run_job, runner_type, x) for x in get_jobs(runner, files)]
+            for future in as_completed(futures):
+                _report(*future.result(), failed)
+    elapsed = time.perf_counter() - start
+    print('{} files: {} succeeded, {} failed in {:.2f}s ({:.1f} files/s)'.format(
+        len(files), len(files) - len(failed), len(failed), elapsed, len(files) / elapsed if elapsed else 0))
+    for x in sorted(failed):
+        print('  failed: ' + x)
+    return len(failed)
+
+
+def _report(filename, success, output, failed):
+    print('{} {}'.format('OK  ' if success else 'FAIL', filename))
+    if output:
+        print(output, end='' if output.endswith('\n') else '\n')
+    if not success:
+        failed.append(filename)
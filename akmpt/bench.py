@@ -0,0 +1,300 @@
+"""Benchmark suite for kmp unpacking, packing, reversal, rotation and group relinking
+
+Times each operation over the test fixtures (or the given files), synthetic courses scaled up from them,
+and generated courses (alone when the fixtures are not installed),
+reporting ops/sec, timings, and peak memory as JSON.
+
+Usage: python -m akmpt.bench [<kmp_file> ...] [--scale=<factor>[,<factor>...]] [--repeat=<n>]
+                             [--output=<json_file>] [--baseline=<json_file>] [--tolerance=<fraction>] [--decode]
+                             [--max]
+    --baseline  compares medians against a stored result, exiting 1 on a regression beyond tolerance (default 0.1)
+    --decode    also reports the per-entry and bulk section decode cost
+    --max       also times a generated course with every section at its format limit (slow)
+"""
+import copy
+import json
+import os
+import platform
+import shutil
+import statistics
+import struct
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from akmpt import VERSION
+from akmpt.generate import generate_kmp, get_max_counts
+from akmpt.kmp import Kmp
+from akmpt.lib.autofix import AutoFix
+from akmpt.lib.binfile import BinFile
+from akmpt.lib.unpacking.unpack_kmp import UnpackKmp, UnpackPoti
+from akmpt.reverse import reverse_kmp
+
+FIXTURES = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'tests', 'fixtures')
+SCALES = (4, 16)
+OPS = ('unpack', 'save', 'reverse', 'rotate', 'relink')
+
+
+def read_sections(filename, scale=1):
+    """Splits a kmp into standalone section blobs, repeating the entries of each by scale"""
+    with open(filename, 'rb') as f:
+        data = f.read()
+    head_len = struct.unpack_from('>H', data, 10)[0]
+    offsets = struct.unpack_from('>15I', data, 16)
+    sections = []
+    for i in range(15):
+        offset = head_len + offsets[i]
+        klass = UnpackKmp.unpackers[i].klass
+        n, added = struct.unpack_from('>2H', data, offset + 4)
+        end = offset + 8
+        if klass.MAGIC == UnpackPoti.klass.MAGIC:
+            for j in range(n):
+                end += 4 + struct.unpack_from('>H', data, end)[0] * 0x10
+        else:
+            end += n * klass.BYTE_LEN
+        factor = min(scale, 0xffff // n) if n else 1
+        blob = data[offset:offset + 4] + struct.pack('>2H', n * factor, added) + data[offset + 8:end] * factor
+        sections.append((i, blob, n * factor))
+    return sections
+
+
+def read_uncached(binfile, fmt, length):
+    """BinFile.read as it was before the Struct cache, building the format string on every read"""
+    read = struct.unpack_from(binfile.bom + fmt, binfile.file, binfile.offset)
+    binfile.advance(length)
+    return read
+
+
+def per_entry_entries(unpacker, binfile):
+    """Decodes the section entries one read at a time (the pre-bulk decoding path)"""
+    klass = unpacker.klass
+    return [unpacker.unpack_data(read_uncached(binfile, klass.FMT, klass.BYTE_LEN))
+            for i in range(unpacker.n_entries)]
+
+
+def time_section(index, blob, repeat, per_entry=False):
+    unpacker_type = UnpackKmp.unpackers[index]
+    fd, tmp = tempfile.mkstemp(suffix='.bin')
+    try:
+        os.write(fd, blob)
+        os.close(fd)
+        binfile = BinFile(tmp)
+        best = float('inf')
+        for i in range(repeat):
+            binfile.offset = 0
+            unpacker = unpacker_type.__new__(unpacker_type)
+            unpacker.node, unpacker.binfile = None, binfile
+            if per_entry and unpacker_type is not UnpackPoti:
+                unpacker.unpack_entries = lambda b, u=unpacker: per_entry_entries(u, b)
+            start = time.perf_counter()
+            unpacker.unpack(None, binfile)
+            best = min(best, time.perf_counter() - start)
+        return best
+    finally:
+        os.remove(tmp)
+
+
+def bench_decode(filename, scale=1, repeat=20):
+    """Returns the per entry decode cost in microseconds for the per-entry and bulk paths"""
+    results = {}
+    for mode in ('per_entry', 'bulk'):
+        total = entries = 0
+        for index, blob, n in read_sections(filename, scale):
+            total += time_section(index, blob, repeat, mode == 'per_entry')
+            entries += n
+        results[mode] = total / entries * 1e6 if entries else 0
+    return results
+
+
+# (attribute, entry limit) of the sections replicated by synthesize, limited by the byte indices referencing them
+REPLICATED = (('game_objects', 0xffff), ('routes', 0xff), ('areas', 0xff), ('cameras', 0xff))
+
+
+def synthesize(filename, scale):
+    """Packs a larger course by replicating the objects, routes, areas, and cameras of filename.
+
+    Replicated entries keep their references, each section stays within the format limits.
+    """
+    kmp = Kmp(filename)
+    kmp.load()
+    shared = {id(x): x for attr in ('routes', 'cameras', 'respawns') for x in getattr(kmp, attr)}
+    for attr, limit in REPLICATED:
+        nodes = getattr(kmp, attr)
+        if nodes:
+            copies = min(scale, limit // len(nodes)) - 1
+            nodes.extend([copy.deepcopy(x, dict(shared)) for i in range(copies) for x in nodes])
+    return kmp.to_bytes(check=False)
+
+
+def time_op(setup, op, repeat):
+    """Times op(setup()) repeat times after a warm up run, then once more under tracemalloc for its peak memory"""
+    op(setup())
+    times = []
+    for i in range(repeat):
+        arg = setup()
+        start = time.perf_counter()
+        op(arg)
+        times.append(time.perf_counter() - start)
+    arg = setup()
+    tracemalloc.start()
+    try:
+        op(arg)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    median = statistics.median(times)
+    return {'median_ms': median * 1e3, 'min_ms': min(times) * 1e3,
+            'ops_per_sec': 1 / median if median else None, 'peak_kb': peak / 1024}
+
+
+def relink(kmp):
+    """Relinks each route group to its own next groups, last group first.
+
+    Each group is unlinked from the previous groups of its next groups, in which it is mostly listed after others.
+    """
+    for groups in (kmp.check_points, kmp.item_routes, kmp.cpu_routes):
+        for group in reversed(groups):
+            group.set_next_groups(list(group.next_groups))
+
+
+def get_ops(filename, out):
+    """(setup, op) of each benchmarked operation on filename, writing to out"""
+    from akmpt.__main__ import RotateRunner
+
+    def unpacked():
+        kmp = Kmp(filename)
+        kmp.close()     # re-encode all sections when saving
+        return kmp
+
+    def rotate_runner():
+        runner = RotateRunner()
+        runner.filename, runner.destination, runner.overwrite = filename, out, True
+        return runner
+
+    return {'unpack': (lambda: filename, Kmp),
+            'save': (unpacked, lambda kmp: kmp.save(out, overwrite=True)),
+            'reverse': (lambda: Kmp(filename), reverse_kmp),
+            'rotate': (rotate_runner, lambda runner: runner.run_file()),
+            'relink': (lambda: Kmp(filename), relink)}
+
+
+def bench_course(filename, repeat, tmp):
+    out = os.path.join(tmp, 'out.kmp')
+    result = {'bytes': os.path.getsize(filename), 'ops': {}}
+    for name, (setup, op) in get_ops(filename, out).items():
+        try:
+            result['ops'][name] = time_op(setup, op, repeat)
+        except Exception as e:
+            result['ops'][name] = {'error': '{}: {}'.format(type(e).__name__, e)}
+    return result
+
+
+def run_suite(files, scales=SCALES, repeat=10, decode=False, generate_max=False):
+    results = {'version': VERSION, 'python': platform.python_version(), 'platform': platform.platform(),
+               'repeat': repeat, 'courses': {}}
+    loudness = AutoFix.loudness
+    AutoFix.loudness = 0
+    tmp = tempfile.mkdtemp()
+    try:
+        for filename in files:
+            name = os.path.basename(filename)
+            results['courses'][name] = bench_course(filename, repeat, tmp)
+            if decode:
+                results['courses'][name]['decode_us_per_entry'] = bench_decode(filename)
+            for scale in scales:
+                synthetic = os.path.join(tmp, 'x{}_{}'.format(scale, name))
+                with open(synthetic, 'wb') as f:
+                    f.write(synthesize(filename, scale))
+                results['courses']['{} x{}'.format(name, scale)] = bench_course(synthetic, repeat, tmp)
+        generated = {'generated': {}}
+        if generate_max:
+            generated['generated max'] = get_max_counts()
+        for name, counts in generated.items():
+            filename = os.path.join(tmp, name.replace(' ', '_') + '.kmp')
+            with open(filename, 'wb') as f:
+                f.write(generate_kmp(**counts).to_bytes())
+            results['courses'][name] = bench_course(filename, repeat, tmp)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+        AutoFix.loudness = loudness
+    return results
+
+
+def compare(results, baseline, tolerance=0.1):
+    """Prints the median ratio to the baseline of each op, returns the regressions beyond tolerance"""
+    regressions = []
+    for course, result in results['courses'].items():
+        base = baseline.get('courses', {}).get(course)
+        if base is None:
+            continue
+        for op, timing in result['ops'].items():
+            base_timing = base['ops'].get(op)
+            if not base_timing or 'median_ms' not in base_timing or 'median_ms' not in timing:
+                continue
+            ratio = timing['median_ms'] / base_timing['median_ms']
+            print('{:24} {:8} {:8.3f} ms  {:6.2f}x baseline'.format(course, op, timing['median_ms'], ratio),
+                  file=sys.stderr)
+            if ratio > 1 + tolerance:
+                regressions.append((course, op, ratio))
+    return regressions
+
+
+def print_results(results):
+    for course, result in results['courses'].items():
+        for op, timing in result['ops'].items():
+            if 'error' in timing:
+                print('{:24} {:8} {}'.format(course, op, timing['error']), file=sys.stderr)
+            else:
+                print('{:24} {:8} {:8.3f} ms {:9.1f} ops/s {:9.1f} KiB'.format(
+                    course, op, timing['median_ms'], timing['ops_per_sec'], timing['peak_kb']), file=sys.stderr)
+
+
+def main(args):
+    files = []
+    scales = SCALES
+    repeat = 10
+    output = baseline = None
+    tolerance = 0.1
+    decode = generate_max = False
+    for arg in args:
+        if arg.startswith('--scale='):
+            scales = [int(x) for x in arg[8:].split(',') if int(x) > 1]
+        elif arg.startswith('--repeat='):
+            repeat = int(arg[9:])
+        elif arg.startswith('--output='):
+            output = arg[9:]
+        elif arg.startswith('--baseline='):
+            baseline = arg[11:]
+        elif arg.startswith('--tolerance='):
+            tolerance = float(arg[12:])
+        elif arg == '--decode':
+            decode = True
+        elif arg == '--max':
+            generate_max = True
+        else:
+            files.append(arg)
+    if not files:
+        if os.path.isdir(FIXTURES):
+            files = [os.path.join(FIXTURES, x) for x in sorted(os.listdir(FIXTURES)) if x.endswith('.kmp')]
+        else:   # installed without the tests
+            print('No test fixtures at {}, timing generated courses only'.format(FIXTURES), file=sys.stderr)
+    results = run_suite(files, scales, repeat, decode, generate_max)
+    print_results(results)
+    data = json.dumps(results, indent=2)
+    if output:
+        with open(output, 'w') as f:
+            f.write(data + '\n')
+    else:
+        print(data)
+    if baseline:
+        with open(baseline) as f:
+            regressions = compare(results, json.load(f), tolerance)
+        for course, op, ratio in regressions:
+            print('REGRESSION {} {}: {:.2f}x baseline'.format(course, op, ratio), file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
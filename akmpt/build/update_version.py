@@ -20,6 +20,7 @@ def update_version(version):
         print('Version already up to date')
         return 0
     version_files = ['../../setup.py', '../dist/install-ubu.txt', '../dist/install-win.txt', '../__main__.py',
+                     '../__init__.py',
                      'update_version.py', '../dist/make_installer.nsi',
                      '../load_config.py']
     # version_files = ['test.txt']
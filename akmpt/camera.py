@@ -2,9 +2,15 @@ from akmpt.base import Base
 
 
 class Camera(Base):
+    __slots__ = ('camera_type', 'next_camera', 'cam_shake', 'route', 'point_speed', 'zoom_speed', 'view_speed',
+                 'start', 'movie', 'position', 'rotation', 'zoom_start', 'zoom_end', 'view_start_pos',
+                 'view_end_pos', 'time')
     MAGIC = 'CAME'
     FMT = '4B3H2B15f'
     BYTE_LEN = 0x48
+    FIELDS = (('camera_type', 1), ('next_camera', 1), ('cam_shake', 1), ('route', 1), ('point_speed', 1),
+              ('zoom_speed', 1), ('view_speed', 1), ('start', 1), ('movie', 1), ('position', 3), ('rotation', 3),
+              ('zoom_start', 1), ('zoom_end', 1), ('view_start_pos', 3), ('view_end_pos', 3), ('time', 1))
 
     def __init__(self, camera_type=0, next_camera=None, cam_shake=0, route=None,
                  point_speed=0, zoom_speed=0, view_speed=0, start=0, movie=0,
@@ -2,9 +2,11 @@ from akmpt.base import Base
 
 
 class Cannon(Base):
+    __slots__ = ('position', 'rotation', 'shoot_effect')
     MAGIC = 'CNPT'
     BYTE_LEN = 0x1c
     FMT = '6f2H'
+    FIELDS = (('position', 3), ('rotation', 3), ('index', 1), ('shoot_effect', 1))
 
     def __init__(self, position=None, rotation=None, shoot_effect=0):
         self.shoot_effect = shoot_effect
@@ -1,7 +1,22 @@
-from akmpt.base import Base, ConnectedPointCollection
+from akmpt.base import Base, ConnectedPointCollection, Vector
+
+
+def get_key_checkpoints(groups):
+    """Maps each key to its key checkpoints in groups"""
+    key_points = {}
+    for group in groups:
+        for x in group:
+            if x.key != 0xff:
+                points = key_points.get(x.key)
+                if points is None:
+                    key_points[x.key] = [x]
+                else:
+                    points.append(x)
+    return key_points
 
 
 class CheckPointGroup(ConnectedPointCollection):
+    __slots__ = ()
     MAGIC = 'CKPH'
 
     def rebuild_pointers(self):
@@ -18,9 +33,11 @@ class CheckPointGroup(ConnectedPointCollection):
 
 
 class CheckPoint(Base):
+    __slots__ = ('left_pole', 'right_pole', 'respawn', 'key', 'previous', 'next')
     MAGIC = 'CKPT'
     FMT = '4f4B'
     BYTE_LEN = 0x14
+    FIELDS = (('left_pole', 2), ('right_pole', 2), ('respawn', 1), ('key', 1), ('previous', 1), ('next', 1))
 
     def __init__(self, left_pole=None, right_pole=None, respawn=None, key=0xff,
                  previous=None, next=None):
@@ -28,8 +45,8 @@ class CheckPoint(Base):
         self.previous = previous
         self.key = key
         self.respawn = respawn
-        self.right_pole = right_pole if right_pole else [0, 0]
-        self.left_pole = left_pole if left_pole else [0, 0]
+        self.right_pole = Vector(right_pole if right_pole else (0, 0))
+        self.left_pole = Vector(left_pole if left_pole else (0, 0))
 
     def __eq__(self, o):
         return self is o or super().__eq__(o) \
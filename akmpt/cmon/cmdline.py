@@ -14,7 +14,7 @@ class ArgRunner:
     help_string = '(Unknown)'
     flags = None            # --flag
     flag_shortcuts = None   # -f
-    named_args = None       # destination=<file>
+    named_args = None       # destination=<file>, --destination <file>
     named_shortcuts = None  # -d <file>
     default = None          # for random arg
     positional_args = None  # Must be at beginning in order (required)
@@ -31,7 +31,8 @@ class ArgRunner:
                 except AttributeError:
                     val = None
                 setattr(self, self.named_args[i], val)
-        setattr(self, self.default, None)
+        if self.default:
+            setattr(self, self.default, None)
 
     def run(self):
         raise NotImplementedError()
@@ -53,8 +54,11 @@ class ArgRunner:
                 setattr(self, self.positional_args[j], a)
                 j += 1
                 continue
-            flag = a.startswith('-')
-            a = a.lstrip('-')
+            flag = a.startswith('-') and a != '-'     # a lone - is stdin or stdout
+            if flag:    # --profile-out sets profile_out
+                a = a.lstrip('-')
+                i = a.find('=')
+                a = a[:i].replace('-', '_') + a[i:] if i > -1 else a.replace('-', '_')
             i = a.find('=')
             if i > -1:
                 attr = a[:i]
@@ -62,6 +66,11 @@ class ArgRunner:
                     if self._on_unknown_arg(a):
                         return args[j:]
                 setattr(self, attr, a[i + 1:])
+            elif flag and self.named_args and a in self.named_args and a not in (self.flags or ()):
+                j += 1      # --name <value>
+                if j >= len(args):
+                    raise ArgParseError(f'{a} requires a value!')
+                setattr(self, a, args[j])
             elif flag:
                 if a not in self.flags:
                     try:
@@ -2,13 +2,16 @@ from akmpt.base import Base, ConnectedPointCollection
 
 
 class CpuRoute(ConnectedPointCollection):
+    __slots__ = ('dispatch_points',)
     MAGIC = 'ENPH'
 
 
 class CpuRoutePoint(Base):
+    __slots__ = ('position', 'width', 'settings', 'prev', 'next')   # prev and next are linked by reverse
     MAGIC = 'ENPT'
     FMT = '4fH2B'
     BYTE_LEN = 0x14
+    FIELDS = (('position', 3), ('width', 1), ('settings', 3))
 
     def __init__(self, position=None, width=0, settings=None):
         [self.position] = self.init_3((position,))
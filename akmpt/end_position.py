@@ -2,14 +2,15 @@ from akmpt.base import Base
 
 
 class EndPosition(Base):
+    __slots__ = ('position', 'rotation', 'unknown')
     MAGIC = 'MSPT'
     FMT = '6f2H'
     BYTE_LEN = 0x1c
+    FIELDS = (('position', 3), ('rotation', 3), ('index', 1), ('unknown', 1))
 
     def __init__(self, position=None, rotation=None, unknown=0):
         self.unknown = unknown
-        self.rotation = rotation if rotation else [0, 0, 0]
-        self.position = position if position else [0, 0, 0]
+        self.rotation, self.position = self.init_3((rotation, position))
 
     def __eq__(self, other):
         return self is other or\
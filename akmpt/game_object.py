@@ -121,21 +121,66 @@ ID_TO_NAME = {1: 'airblock', 2: 'Psea', 3: 'lensFX', 4: 'venice_nami', 5: 'sound
               755: 'DKfalls'}
 
 
+class IndexedField:
+    """Game object attribute, kept up to date in the GameObjectIndex holding the object"""
+
+    def __set_name__(self, owner, name):
+        self.slot = getattr(owner, '_' + name)
+
+    def __get__(self, obj, owner=None):
+        if obj is None:
+            return self
+        return self.slot.__get__(obj, owner)
+
+    def __set__(self, obj, value):
+        indexes = getattr(obj, '_owners', ())
+        for x in indexes:
+            x.remove_keys(obj)
+        self.store(obj, value)
+        for x in indexes:
+            x.insert_keys(obj)
+
+    def store(self, obj, value):
+        self.slot.__set__(obj, value)
+
+
+class IdField(IndexedField):
+    """Game object id, also renaming the object to match"""
+
+    def store(self, obj, value):
+        obj._id = value
+        obj._name = ID_TO_NAME.get(value)
+
+
 class GameObject(Base):
+    __slots__ = ('_id', '_name', 'extended_presence', 'position', 'rotation', 'scale', '_route', 'settings',
+                 '_presence', '_owners')
     MAGIC = 'GOBJ'
     FMT = '2H9f10H'
     BYTE_LEN = 0x3c
+    FIELDS = (('id', 1), ('extended_presence', 1), ('position', 3), ('rotation', 3), ('scale', 3), ('route', 1),
+              ('settings', 8), ('presence', 1))
+    id = IdField()
+    name = IndexedField()
+    route = IndexedField()
+    presence = IndexedField()
 
     def __init__(self, id=0, extended_presence=0, position=None, rotation=None,
                  scale=None, route=None,
                  settings=None, presence=7):
-        self.id = id
+        self._owners = ()   # GameObjectIndexes holding the object
+        self._id = id
+        self._name = ID_TO_NAME.get(id)
         self.extended_presence = extended_presence
         self.position, self.rotation, self.scale = self.init_3(
             (position, rotation, scale))
-        self.route = route
+        self._route = route
         self.settings = list(settings) if settings else [0] * 8
-        self.presence = presence
+        self._presence = presence
+
+    def __getstate__(self):
+        """The slot values, without the indexes holding the object"""
+        return None, {x: getattr(self, x) for x in ('index',) + self.__slots__[:-1] if hasattr(self, x)}
 
     def __eq__(self, other):
         return self is other or \
@@ -143,3 +188,185 @@ class GameObject(Base):
                and self.position == other.position \
                and self.rotation == other.rotation and self.scale == other.scale and self.route == other.route \
                and self.presence == other.presence and self.extended_presence == other.extended_presence
+
+
+def get_route_key(route):
+    return id(route) if route is not None else None
+
+
+class GameObjectIndex:
+    """Game objects by id, name, route, and presence.
+
+    Each lookup is a dict of the objects by identity, so that adding and removing are O(1).
+    Objects held more than once are counted, and an object may be in several indexes, each re-keyed
+    when an indexed field changes. Lookups list objects in the order they were indexed,
+    an object changed since is listed after the others.
+    """
+
+    def __init__(self, objects=()):
+        self.by_id = {}
+        self.by_name = {}
+        self.by_route = {}     # id() of the route: objects, None for objects without a route
+        self.by_presence = {}
+        self.counts = {}
+        for x in objects:
+            self.add(x)
+
+    def __len__(self):
+        return len(self.counts)
+
+    def get_keys(self, obj):
+        return ((self.by_id, obj.id), (self.by_name, obj.name), (self.by_route, get_route_key(obj.route)),
+                (self.by_presence, obj.presence))
+
+    def add(self, obj):
+        key = id(obj)
+        count = self.counts.get(key, 0)
+        self.counts[key] = count + 1
+        if not count:
+            obj._owners = getattr(obj, '_owners', ()) + (self,)
+            self.insert_keys(obj)
+
+    def discard(self, obj):
+        key = id(obj)
+        count = self.counts.get(key)
+        if count is None:
+            return
+        if count > 1:
+            self.counts[key] = count - 1
+            return
+        del self.counts[key]
+        obj._owners = tuple([x for x in obj._owners if x is not self])
+        self.remove_keys(obj)
+
+    def release(self):
+        """Stops indexing the objects, leaving the index empty"""
+        for values in self.by_id.values():
+            for obj in values.values():
+                obj._owners = tuple([x for x in obj._owners if x is not self])
+        self.__init__()
+
+    def insert_keys(self, obj):
+        key = id(obj)
+        for lookup, value in self.get_keys(obj):
+            objects = lookup.get(value)
+            if objects is None:
+                lookup[value] = {key: obj}
+            else:
+                objects[key] = obj
+
+    def remove_keys(self, obj):
+        key = id(obj)
+        for lookup, value in self.get_keys(obj):
+            objects = lookup[value]
+            del objects[key]
+            if not objects:
+                del lookup[value]
+
+    def get_by_id(self, id):
+        return list(self.by_id.get(id, {}).values())
+
+    def get_by_name(self, name):
+        return list(self.by_name.get(name, {}).values())
+
+    def get_by_route(self, route):
+        return list(self.by_route.get(get_route_key(route), {}).values())
+
+    def get_by_presence(self, flags):
+        """Objects present in any of the presence flags"""
+        return [x for presence, objects in self.by_presence.items() if presence & flags for x in objects.values()]
+
+    def select(self, id=None, name=None, route=None, presence=None):
+        """Objects matching all the keys given, found from the fewest candidates.
+
+        route is a Route, or False for objects without one.
+        """
+        lookups = []
+        if id is not None:
+            lookups.append(self.by_id.get(id, {}))
+        if name is not None:
+            lookups.append(self.by_name.get(name, {}))
+        if route is not None:
+            lookups.append(self.by_route.get(get_route_key(None if route is False else route), {}))
+        if not lookups:
+            objects = [x for objects in self.by_id.values() for x in objects.values()]
+        else:
+            lookups.sort(key=len)
+            objects = [x for key, x in lookups[0].items() if all(key in y for y in lookups[1:])]
+        if presence is not None:
+            objects = [x for x in objects if x.presence & presence]
+        return objects
+
+
+class GameObjectList(list):
+    """The game objects of a kmp, kept in object_index as they are added, removed, or changed"""
+
+    def __init__(self, objects=()):
+        super().__init__(objects)
+        self.object_index = GameObjectIndex(self)
+
+    def __reduce_ex__(self, protocol):
+        return type(self), (list(self),)
+
+    def find(self, obj):
+        """Position of obj itself, rather than an equal object"""
+        for i in range(len(self)):
+            if self[i] is obj:
+                return i
+        raise ValueError('Game object not in list')
+
+    def append(self, obj):
+        super().append(obj)
+        self.object_index.add(obj)
+
+    def extend(self, objects):
+        objects = list(objects)
+        super().extend(objects)
+        for x in objects:
+            self.object_index.add(x)
+
+    def __iadd__(self, objects):
+        self.extend(objects)
+        return self
+
+    def __imul__(self, n):
+        objects = list(self)
+        super().__imul__(n)
+        for x in objects:
+            self.object_index.discard(x)
+        for x in self:
+            self.object_index.add(x)
+        return self
+
+    def insert(self, i, obj):
+        super().insert(i, obj)
+        self.object_index.add(obj)
+
+    def remove(self, obj):
+        del self[self.find(obj)]
+
+    def pop(self, i=-1):
+        obj = super().pop(i)
+        self.object_index.discard(obj)
+        return obj
+
+    def clear(self):
+        for x in self:
+            self.object_index.discard(x)
+        super().clear()
+
+    def __setitem__(self, key, value):
+        old = self[key] if type(key) is slice else [self[key]]
+        if type(key) is slice:
+            value = list(value)
+        super().__setitem__(key, value)
+        for x in old:
+            self.object_index.discard(x)
+        for x in value if type(key) is slice else [value]:
+            self.object_index.add(x)
+
+    def __delitem__(self, key):
+        old = self[key] if type(key) is slice else [self[key]]
+        super().__delitem__(key)
+        for x in old:
+            self.object_index.discard(x)
@@ -0,0 +1,162 @@
+"""Synthetic kmp courses, for scaling and stress tests up to the format limits
+
+Usage: python -m akmpt.generate <destination> [--max] [<count>=<n> ...] [-o]
+    --max   every section at its format limit
+    counts: cpu_groups, cpu_points, item_groups, item_points, checkpoint_groups, checkpoints,
+            game_objects, routes, route_points, cameras, areas, links
+"""
+import math
+import sys
+
+from akmpt.area import Area
+from akmpt.camera import Camera
+from akmpt.checkpoint import CheckPointGroup, CheckPoint
+from akmpt.cpu_route import CpuRoute, CpuRoutePoint
+from akmpt.game_object import GameObject
+from akmpt.item_route import ItemRoute, ItemRoutePoint
+from akmpt.kmp import Kmp
+from akmpt.respawn import Respawn
+from akmpt.route import Route, RoutePoint
+from akmpt.start_position import StartPosition
+
+# most entries of each kind, as referenced by byte indices (0xff meaning none), or halfword counts
+MAX_POINTS = 0xff           # per point section, groups index them by a byte start
+MAX_GROUPS = 0xff
+MAX_LINKS = 6               # next/prev groups of a group
+MAX_ROUTES = 0xff
+MAX_CAMERAS = 0xff
+MAX_AREAS = 0xffff
+MAX_GAME_OBJECTS = 0xffff
+MAX_ROUTE_POINTS = 0xffff
+
+ITEM_BOX = 101
+
+
+def get_max_counts(links=MAX_LINKS):
+    """Counts generating a course with every section at its limit"""
+    groups = 51     # 51 groups of 5 points fill the 255 points
+    return dict(cpu_groups=groups, cpu_points=5, item_groups=groups, item_points=5,
+                checkpoint_groups=groups, checkpoints=5, game_objects=MAX_GAME_OBJECTS, routes=MAX_ROUTES,
+                route_points=16, cameras=MAX_CAMERAS, areas=MAX_AREAS, links=links)
+
+
+def check_counts(cpu_groups, cpu_points, item_groups, item_points, checkpoint_groups, checkpoints,
+                 game_objects, routes, route_points, cameras, areas, links):
+    for groups, points, name in ((cpu_groups, cpu_points, 'cpu'), (item_groups, item_points, 'item'),
+                                 (checkpoint_groups, checkpoints, 'checkpoint')):
+        if not 1 <= groups <= MAX_GROUPS:
+            raise ValueError('{} groups must be 1 to {}'.format(name, MAX_GROUPS))
+        if points < 1 or groups * points > MAX_POINTS:
+            raise ValueError('{} points must be 1 to {} in total'.format(name, MAX_POINTS))
+    if not 1 <= links <= MAX_LINKS:
+        raise ValueError('links must be 1 to {}'.format(MAX_LINKS))
+    for count, limit, name in ((game_objects, MAX_GAME_OBJECTS, 'game_objects'), (routes, MAX_ROUTES, 'routes'),
+                               (route_points, MAX_ROUTE_POINTS, 'route_points'), (cameras, MAX_CAMERAS, 'cameras'),
+                               (areas, MAX_AREAS, 'areas')):
+        if not 0 <= count <= limit:
+            raise ValueError('{} must be 0 to {}'.format(name, limit))
+    if routes and not route_points:
+        raise ValueError('routes need at least 1 route point')
+
+
+def ring_position(i, n, radius, height=0):
+    angle = 2 * math.pi * i / n
+    return [radius * math.cos(angle), height, radius * math.sin(angle)]
+
+
+def ring_rotation(i, n):
+    """Y rotation in degrees facing along the ring"""
+    return [0, (-360 * i / n) % 360, 0]
+
+
+def link_ring(groups, links):
+    """Links each group to the next links groups of the ring"""
+    n = len(groups)
+    links = max(1, min(links, n - 1))   # a single group links to itself
+    for i in range(n):
+        for k in range(1, links + 1):
+            groups[i].add_next_group(groups[(i + k) % n])
+
+
+def build_ring(group_type, point_type, n_groups, n_points, links, radius):
+    n = n_groups * n_points
+    groups = [group_type([point_type(ring_position(i * n_points + j, n, radius), 10)
+                          for j in range(n_points)]) for i in range(n_groups)]
+    link_ring(groups, links)
+    return groups
+
+
+def build_check_points(n_groups, n_points, links, radius, width=1000):
+    n = n_groups * n_points
+    groups = []
+    respawns = []
+    for i in range(n_groups):
+        points = []
+        for j in range(n_points):
+            x, y, z = ring_position(i * n_points + j, n, 1)
+            points.append(CheckPoint([(radius - width) * x, (radius - width) * z],
+                                     [(radius + width) * x, (radius + width) * z], key=0xff))
+        respawn = Respawn(ring_position(i * n_points, n, radius), ring_rotation(i * n_points, n))
+        for x in points:
+            x.respawn = respawn
+        points[0].key = 0   # key checkpoints are numbered by recalc_key_checkpoints
+        group = CheckPointGroup(points)
+        group.rebuild_pointers()
+        groups.append(group)
+        respawns.append(respawn)
+    link_ring(groups, links)
+    return groups, respawns
+
+
+def generate_kmp(cpu_groups=8, cpu_points=8, item_groups=8, item_points=8, checkpoint_groups=8, checkpoints=8,
+                 game_objects=64, routes=8, route_points=8, cameras=8, areas=8, links=1, radius=20000, name=None):
+    """Generates a ring course, point counts are per group.
+
+    Each group links to the next links groups around the ring, objects and areas reference the routes and cameras.
+    """
+    check_counts(cpu_groups, cpu_points, item_groups, item_points, checkpoint_groups, checkpoints,
+                 game_objects, routes, route_points, cameras, areas, links)
+    kmp = Kmp(name, read_file=False)
+    kmp.cpu_routes = build_ring(CpuRoute, CpuRoutePoint, cpu_groups, cpu_points, links, radius)
+    kmp.item_routes = build_ring(ItemRoute, ItemRoutePoint, item_groups, item_points, links, radius)
+    kmp.check_points, kmp.respawns = build_check_points(checkpoint_groups, checkpoints, links, radius)
+    kmp.recalc_key_checkpoints()
+    kmp.start_positions = [StartPosition(ring_position(0, 1, radius), ring_rotation(0, 1))]
+    kmp.routes = [Route([RoutePoint(ring_position(j, route_points, 500, 100 * i), 10)
+                         for j in range(route_points)]) for i in range(routes)]
+    kmp.game_objects = [GameObject(ITEM_BOX, position=ring_position(i, game_objects, radius, 200),
+                                   route=kmp.routes[i % routes] if routes and i % 4 == 0 else None)
+                        for i in range(game_objects)]
+    kmp.cameras = [Camera(route=kmp.routes[i % routes] if routes else None,
+                          position=ring_position(i, cameras, radius, 1000)) for i in range(cameras)]
+    for i in range(cameras - 1):
+        kmp.cameras[i].next_camera = kmp.cameras[i + 1]
+    if cameras:
+        kmp.pan_cam = kmp.cameras[0]
+        kmp.movie_cam = kmp.cameras[-1]
+    kmp.areas = [Area(camera=kmp.cameras[i % cameras] if cameras else None,
+                      position=ring_position(i, areas, radius), scale=[1, 1, 1]) for i in range(areas)]
+    return kmp
+
+
+def main(args):
+    if not args or args[0] in ('-h', '--help'):
+        print(__doc__)
+        return 1
+    destination = args.pop(0)
+    overwrite = False
+    counts = {}
+    for arg in args:
+        if arg in ('-o', '--overwrite'):
+            overwrite = True
+        elif arg == '--max':
+            counts.update(get_max_counts())
+        else:
+            key, value = arg.lstrip('-').split('=')
+            counts[key] = int(value)
+    kmp = generate_kmp(**counts)
+    return 0 if kmp.save(destination, overwrite) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,122 @@
+"""Geometry kernels, in plain python for single points and numpy for batches.
+
+Single point functions avoid numpy, its overhead dominates at that size.
+Batch functions take (N, k) arrays and broadcast against each other.
+"""
+import math
+
+import numpy as np
+
+CHUNK_SIZE = 1 << 18    # query/target pairs per chunk of the nearest queries
+
+
+def distance(p1, p2):
+    return math.sqrt((p2[0] - p1[0])**2 + (p2[1] - p1[1])**2 + (p2[2] - p1[2])**2)
+
+
+def get_y_rotation(origin, p2):
+    """Get the y-rotation in degrees between two 3d points"""
+    return math.atan2(p2[0] - origin[0], p2[2] - origin[2]) * 180 / math.pi
+
+
+def is_ahead(left, right, p):
+    return (right[0] - left[0]) * (right[1] - p[1]) - (right[1] - left[1]) * (right[0] - p[0]) > 0
+
+
+def closest_point_on_line(point, lp1, lp2):
+    """Projects point onto the line through lp1 and lp2"""
+    v = [b - a for a, b in zip(lp1, lp2)]
+    t = sum([(p - a) * x for p, a, x in zip(point, lp1, v)]) / sum([x * x for x in v])
+    return [a + t * x for a, x in zip(lp1, v)]
+
+
+def closest_point_on_segment(point, start, end):
+    """Gets the parameter t (0 to 1) and the closest point to point on the segment start to end"""
+    v = [b - a for a, b in zip(start, end)]
+    vv = sum([x * x for x in v])
+    t = sum([(p - a) * x for p, a, x in zip(point, start, v)]) / vv if vv else 0.0
+    t = 0.0 if t < 0 else 1.0 if t > 1 else t
+    return t, [a + t * x for a, x in zip(start, v)]
+
+
+def distances(p1, p2):
+    """Distances between the rows of p1 and p2"""
+    diff = np.asarray(p2, dtype=float) - np.asarray(p1, dtype=float)
+    return np.sqrt(np.einsum('...k,...k->...', diff, diff))
+
+
+def get_y_rotations(origins, targets):
+    """Y-rotations in degrees from the rows of origins to those of targets"""
+    diff = np.asarray(targets, dtype=float) - np.asarray(origins, dtype=float)
+    return np.degrees(np.arctan2(diff[..., 0], diff[..., 2]))
+
+
+def closest_points_on_lines(points, lp1, lp2):
+    """Projects the rows of points onto the lines through the rows of lp1 and lp2"""
+    points = np.asarray(points, dtype=float)
+    lp1 = np.asarray(lp1, dtype=float)
+    v = np.asarray(lp2, dtype=float) - lp1
+    t = np.einsum('...k,...k->...', points - lp1, v) / np.einsum('...k,...k->...', v, v)
+    return lp1 + t[..., None] * v
+
+
+def move_towards(points, targets, d):
+    """Moves the rows of points up to d toward targets, stopping at them.
+
+    Returns the moved points and the distance each has left over (0 unless it reached its target).
+    """
+    points = np.asarray(points, dtype=float)
+    targets = np.asarray(targets, dtype=float)
+    d = np.broadcast_to(np.asarray(d, dtype=float), points.shape[:-1])
+    dist = distances(points, targets)
+    short = dist > d
+    scale = np.divide(d, dist, out=np.ones_like(dist), where=short)
+    moved = points + (targets - points) * scale[..., None]
+    return moved, np.where(short, 0.0, d - dist)
+
+
+def nearest_points(queries, points, chunk_size=CHUNK_SIZE):
+    """Gets the index of the nearest of points (N, 3) to each of queries (M, 3), and the distance to it.
+
+    Queries are compared with all points at once, in chunks of at most chunk_size pairs.
+    """
+    queries = np.asarray(queries, dtype=float).reshape(-1, 3)
+    points = np.asarray(points, dtype=float).reshape(-1, 3)
+    if not len(points):
+        raise ValueError('No points to compare')
+    indices = np.empty(len(queries), dtype=np.intp)
+    dist = np.empty(len(queries))
+    step = max(1, chunk_size // len(points))
+    for i in range(0, len(queries), step):
+        diff = queries[i:i + step, None, :] - points[None, :, :]
+        d2 = np.einsum('ijk,ijk->ij', diff, diff)
+        nearest = d2.argmin(axis=1)
+        indices[i:i + step] = nearest
+        dist[i:i + step] = np.sqrt(d2[np.arange(len(nearest)), nearest])
+    return indices, dist
+
+
+def nearest_segments(queries, starts, ends, chunk_size=CHUNK_SIZE):
+    """Gets the nearest of the segments starts (N, 3) to ends (N, 3) for each of queries (M, 3).
+
+    Returns the segment indices, the parameters t along them, the closest points, and the distances.
+    """
+    queries = np.asarray(queries, dtype=float).reshape(-1, 3)
+    starts = np.asarray(starts, dtype=float).reshape(-1, 3)
+    deltas = np.asarray(ends, dtype=float).reshape(-1, 3) - starts
+    if not len(starts):
+        raise ValueError('No segments to compare')
+    lengths = np.einsum('ij,ij->i', deltas, deltas)
+    lengths[lengths == 0] = 1  # a zero length segment projects to t = 0
+    indices = np.empty(len(queries), dtype=np.intp)
+    t = np.empty(len(queries))
+    step = max(1, chunk_size // len(starts))
+    for i in range(0, len(queries), step):
+        diff = queries[i:i + step, None, :] - starts[None, :, :]
+        ts = np.clip(np.einsum('ijk,jk->ij', diff, deltas) / lengths, 0, 1)
+        diff -= ts[:, :, None] * deltas
+        nearest = np.einsum('ijk,ijk->ij', diff, diff).argmin(axis=1)
+        indices[i:i + step] = nearest
+        t[i:i + step] = ts[np.arange(len(nearest)), nearest]
+    closest = starts[indices] + t[:, None] * deltas[indices]
+    return indices, t, closest, distances(queries, closest)
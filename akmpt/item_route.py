@@ -2,13 +2,16 @@ from akmpt.base import Base, ConnectedPointCollection
 
 
 class ItemRoute(ConnectedPointCollection):
+    __slots__ = ()
     MAGIC = 'ITPH'
 
 
 class ItemRoutePoint(Base):
+    __slots__ = ('position', 'width', 'settings', 'prev', 'next')   # prev and next are linked by reverse
     MAGIC = 'ITPT'
     FMT = '4f2H'
     BYTE_LEN = 0x14
+    FIELDS = (('position', 3), ('width', 1), ('settings', 2))
 
     def __init__(self, position=None, width=0, settings=None):
         [self.position] = self.init_3((position,))
@@ -1,8 +1,11 @@
-import math
 import os
+from contextlib import contextmanager
 
 from akmpt.cmon import pmap, mapa
 
+from akmpt.checkpoint import get_key_checkpoints
+from akmpt.lib.arrays import KmpArrays
+from akmpt.game_object import GameObjectList
 from akmpt.lib.autofix import AutoFix
 from akmpt.lib.packing.pack_kmp import PackKmp
 from akmpt.lib.unpacking.unpack_kmp import UnpackKmp
@@ -10,54 +13,202 @@ from akmpt.respawn import Respawn
 from akmpt.stage_info import StageInfo
 from akmpt.start_position import StartPosition
 from akmpt.lib.binfile import BinFile
+from akmpt.lib.graph import GroupGraph, MAX_LINKS
 from akmpt.lib.pack_interface import Packable
-from akmpt.utils import distance
+from akmpt.lib.spatial import SegmentIndex
+
+
+class Section:
+    """Kmp section attribute, unpacked on first access when the kmp is lazy.
+
+    Accessing or setting it marks the section dirty, so that it is re-encoded when packing,
+    and drops the indexes derived from it.
+    """
+
+    def __init__(self, index):
+        self.index = index
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, kmp, owner=None):
+        if kmp is None:
+            return self
+        try:
+            value = kmp.__dict__[self.name]
+        except KeyError:
+            if kmp.unpacker is None:
+                raise AttributeError(self.name)
+            kmp.load_section(self.index)
+            value = kmp.__dict__[self.name]
+        kmp.dirty.add(self.index)
+        kmp.indexes.pop(self.index, None)
+        return value
+
+    def __set__(self, kmp, value):
+        kmp.__dict__[self.name] = value
+        kmp.dirty.add(self.index)
+        kmp.indexes.pop(self.index, None)
+
+
+class GameObjects(Section):
+    """Game objects section, held in a GameObjectList so that they stay indexed as they are edited"""
+
+    def __set__(self, kmp, value):
+        previous = kmp.__dict__.get(self.name)
+        if type(previous) is GameObjectList and previous is not value:
+            previous.object_index.release()
+        if type(value) is not GameObjectList:
+            value = GameObjectList(value)
+        super().__set__(kmp, value)
 
 
 class Kmp(Packable):
     MAGIC = 'RKMD'
+    unpacker = None     # source of the kmp, kept until closed to unpack and copy sections from
+
+    start_positions = Section(0)
+    cpu_routes = Section(2)
+    item_routes = Section(4)
+    check_points = Section(6)
+    game_objects = GameObjects(7)
+    routes = Section(8)
+    areas = Section(9)
+    cameras = Section(10)
+    pan_cam = Section(10)
+    movie_cam = Section(10)
+    respawns = Section(11)
+    cannons = Section(12)
+    end_positions = Section(13)
+    stage_info = Section(14)
 
     @property
     def is_battle_mode(self):
         return len(self.end_positions) > 0
 
-    def __init__(self, name, parent=None, read_file=True):
-        self.object_map = None
-        self.name = os.path.abspath(name)
-        binfile = BinFile(self.name) if read_file else None
-        if binfile:
-            self.unpack(binfile)
+    def __init__(self, name, parent=None, read_file=True, memory_map=False, lazy=False, data=None):
+        """
+        name:   kmp file name
+        memory_map: read the file through mmap
+        lazy:   only unpack sections as they are accessed
+        data:   bytes-like kmp data to unpack instead of reading name
+        A lazy kmp holds the source until closed, otherwise its bytes are copied out and the file or map released.
+        Sections not accessed are copied from the source bytes when packing.
+        """
+        self.dirty = set()
+        self.indexes = {}   # section index: {name: index derived from it}, see Section
+        self.name = os.path.abspath(name) if name else None
+        if read_file or data is not None:
+            binfile = BinFile(self.name, memory_map=memory_map, data=data)
+            try:
+                with self.untracked():
+                    self.unpacker = UnpackKmp(self, binfile, lazy)
+                if not lazy:
+                    binfile.detach()
+            except:
+                binfile.close()
+                raise
         else:
             self.begin()
 
-    def __create_obj_map(self):
-        self.object_map = {}
-        for x in self.game_objects:
-            y = self.object_map.get(x.name)
-            if not y:
-                self.object_map[x.name] = [x]
-            else:
-                y.append(x)
-        return self.object_map
+    @classmethod
+    def from_bytes(cls, data, name=None, lazy=False):
+        """Unpacks a kmp from a bytes-like object, name is used when saving"""
+        return cls(name, data=data, lazy=lazy)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        """Releases the source, sections not yet unpacked are no longer available and all are re-encoded"""
+        if self.unpacker is not None:
+            self.unpacker.binfile.close()
+            self.unpacker = None
+
+    def __getstate__(self):
+        """Pickles the unpacked sections, without the source"""
+        self.load_all()
+        state = self.__dict__.copy()
+        state.pop('unpacker', None)
+        state['indexes'] = {}
+        return state
+
+    @contextmanager
+    def untracked(self):
+        """Section accesses within do not mark sections dirty"""
+        dirty = set(self.dirty)
+        try:
+            yield self
+        finally:
+            self.dirty = dirty
+
+    def load_section(self, index):
+        with self.untracked():
+            self.unpacker.load(index)
+
+    def load_all(self):
+        """Unpacks all remaining sections, keeping the source"""
+        unpacker = self.unpacker
+        if unpacker is not None:
+            with self.untracked():
+                for i in range(len(unpacker.offsets)):
+                    unpacker.load(i)
+
+    def load(self):
+        """Unpacks all remaining sections and releases the source"""
+        self.load_all()
+        self.close()
+
+    @property
+    def arrays(self):
+        """Columnar numpy view of the sections, see KmpArrays"""
+        return KmpArrays(self)
 
     def get_height_at(self, x=0, z=0):
         return 10000
 
+    def get_derived(self, name, sections):
+        """Gets the index name derived from sections, None if any of them has been accessed or set since"""
+        value = None
+        for i in sections:
+            x = self.indexes.get(i, {}).get(name)
+            if x is None or value is not None and x is not value:
+                return None
+            value = x
+        return value
+
+    def set_derived(self, name, sections, value):
+        """Stores value as the index name derived from sections, see get_derived"""
+        for i in sections:
+            self.indexes.setdefault(i, {})[name] = value
+        return value
+
+    def get_cpu_segment_index(self):
+        """SegmentIndex of the cpu routes, rebuilt once cpu_routes has been accessed or set"""
+        index = self.get_derived('cpu_segments', (2,))
+        if index is None:
+            with self.untracked():
+                routes = self.cpu_routes
+            index = self.set_derived('cpu_segments', (2,), SegmentIndex(routes))
+        return index
+
+    def get_closest_cpu_segment(self, point):
+        """Gets the SegmentHit of the connected cpu route segment nearest point, None without cpu routes"""
+        return self.get_cpu_segment_index().nearest(point)
+
+    def get_closest_cpu_segments(self, points):
+        """Gets the SegmentHit nearest each of points (M, 3), in one batch"""
+        return self.get_cpu_segment_index().nearest_all(points)
+
     def get_closest_cpu_pos(self, point):
-        mins = [math.inf, math.inf]
-        min_pos = [None, None]
-        for r in self.cpu_routes:
-            for pos in r:
-                d = distance(pos.position, point)
-                if d < mins[0]:
-                    mins[1] = mins[0]
-                    min_pos[1] = min_pos[0]
-                    mins[0] = d
-                    min_pos[0] = pos
-                elif d < mins[1]:
-                    mins[1] = d
-                    min_pos[1] = pos
-        return min_pos
+        """Gets the start and end points of the connected cpu route segment nearest point"""
+        hit = self.get_closest_cpu_segment(point)
+        if hit is None:
+            return [None, None]
+        return [hit.start, hit.end]
 
     def get_start_checkpoint(self):
         for group in self.check_points:
@@ -84,29 +235,38 @@ class Kmp(Packable):
         self.additional_values = [0] * 15
 
     def recalc_key_checkpoints(self):
-        group = self.check_points[0]
-        self.__recalc_key_checkpoint_group(0, group, [])
+        """Numbers the key checkpoints in order from the first group, each group numbered once.
 
-    def __recalc_key_checkpoint_group(self, key, group, groups_done):
-        if group in groups_done:
-            return
-        for x in group:
-            if x.key != 0xff:
-                x.key = key
-                key += 1
-        groups_done.append(group)
-        for x in group.next_groups:
-            self.__recalc_key_checkpoint_group(key, x, groups_done)
+        Returns the key checkpoints by key.
+        """
+        groups = self.check_points
+        if not groups:
+            return {}
+        graph = GroupGraph.from_groups(groups)
+        done = set()
+        stack = [(0, 0)]    # (group, its first key), the next groups of the first group found are numbered first
+        while stack:
+            i, key = stack.pop()
+            if i in done:
+                continue
+            done.add(i)
+            for x in groups[i]:
+                if x.key != 0xff:
+                    x.key = key
+                    key += 1
+            stack.extend([(x, key) for x in list(graph.next[i])[::-1]])
+        return get_key_checkpoints(groups)
 
     def unpack(self, binfile):
         UnpackKmp(self, binfile)
 
     def pack(self, binfile):
-        PackKmp(self, binfile)
+        with self.untracked():
+            PackKmp(self, binfile)
 
     def __eq__(self, other):
         return self is other or \
-               super().__eq__(other) and self.version == other.version and \
+               type(other) is type(self) and self.version == other.version and \
             self.stage_info == other.stage_info and \
             self.areas == other.areas and \
             self.cameras == other.cameras and \
@@ -123,21 +283,49 @@ class Kmp(Packable):
             self.movie_cam == other.movie_cam
 
     def __getitem__(self, item):
+        """Game objects by name, id, or slice, raising KeyError for an unknown name"""
+        if type(item) is slice:
+            return self.game_objects[item]
+        index = self.game_objects.object_index
         if type(item) is str:
-            if not self.object_map:
-                self.__create_obj_map()
-            return self.object_map[item]
-        else:
-            return [x for x in self.game_objects if x.id == item]
+            objects = index.get_by_name(item)
+            if not objects:
+                raise KeyError(item)
+            return objects
+        return index.get_by_id(item)
 
     def check(self):
-        if not self.respawns:
+        with self.untracked():
+            respawns, pan_cam, movie_cam = self.respawns, self.pan_cam, self.movie_cam
+            if self.check_points:   # a race course, battle courses have no checkpoints
+                # sections not unpacked are copied unchanged
+                for name in ('check_points', 'cpu_routes', 'item_routes'):
+                    if name in self.__dict__:
+                        self.check_groups(name)
+        if not respawns:
             AutoFix.warn('No respawns found! Adding generic...')
             self.respawns.append(Respawn([0, self.get_height_at(), 0]))
 
         # todo add cams
-        if not self.pan_cam:
+        if not pan_cam:
             AutoFix.warn('No opening pan camera!')
-        if not self.movie_cam:
+        if not movie_cam:
             AutoFix.warn('No movie cam!')
 
+    def check_groups(self, name):
+        """Warns of the groups of section name off the loop through the first group, or with too many links"""
+        groups = getattr(self, name)
+        if not groups:
+            return
+        try:
+            graph = GroupGraph.from_groups(groups)
+        except ValueError as e:
+            AutoFix.warn(str(e))
+            return
+        loop = next(x for x in graph.strongly_connected_components() if 0 in x)
+        if len(loop) < len(groups):
+            off_loop = sorted(set(range(len(groups))) - set(loop))
+            AutoFix.warn('{} groups {} are not on a loop through the first group', 2, name, off_loop)
+        for i in range(len(graph)):
+            if len(graph.next[i]) > MAX_LINKS or len(graph.prev[i]) > MAX_LINKS:
+                AutoFix.warn('{} group {} has more than {} links', 2, name, i, MAX_LINKS)
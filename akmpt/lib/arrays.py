@@ -0,0 +1,117 @@
+"""Columnar numpy views of kmp sections"""
+import re
+
+import numpy as np
+
+from akmpt.geometry import nearest_points
+from akmpt.lib.binfile import BinFile
+from akmpt.lib.packing.pack_kmp import PackKmp
+
+NUMPY_CODES = {'f': 'f4', 'I': 'u4', 'i': 'i4', 'H': 'u2', 'h': 'i2', 'B': 'u1', 'b': 'i1'}
+_DTYPES = {}
+
+
+def expand_fmt(fmt):
+    """Expands a struct format into one code per value, '2Hf' -> ['H', 'H', 'f']"""
+    return [code for count, code in re.findall(r'(\d*)(\w)', fmt) for i in range(int(count) if count else 1)]
+
+
+def get_fields(klass):
+    """Gets the (name, codes) of each field in klass.FMT"""
+    codes = expand_fmt(klass.FMT)
+    fields = []
+    i = 0
+    for name, count in klass.FIELDS:
+        fields.append((name, codes[i:i + count]))
+        i += count
+    if i != len(codes):
+        raise ValueError('{} FIELDS do not cover FMT {}'.format(klass.__name__, klass.FMT))
+    return fields
+
+
+def get_dtype(klass, bom='>'):
+    """Gets the numpy structured dtype for a section entry, fields spanning mixed types are split as name_i"""
+    key = (klass, bom)
+    dtype = _DTYPES.get(key)
+    if dtype is None:
+        descr = []
+        for name, codes in get_fields(klass):
+            if len(codes) == 1:
+                descr.append((name, bom + NUMPY_CODES[codes[0]]))
+            elif len(set(codes)) == 1:
+                descr.append((name, bom + NUMPY_CODES[codes[0]], (len(codes),)))
+            else:
+                descr.extend((name + '_' + str(i), bom + NUMPY_CODES[codes[i]]) for i in range(len(codes)))
+        dtype = _DTYPES[key] = np.dtype(descr)
+    return dtype
+
+
+class KmpArrays:
+    """Structured array view of a kmp's fixed-stride sections.
+
+    Sections unchanged since unpacking are read from the source bytes, the others are encoded from the kmp nodes.
+    Arrays are cached in kmp.indexes until their section, or one it references, is accessed or set.
+    Indices (route, camera, respawn...) are the packed section indices.
+    """
+    MAGICS = [x.klass.MAGIC for x in PackKmp.packers]
+
+    def __init__(self, kmp):
+        self.kmp = kmp
+
+    def __getitem__(self, magic):
+        return self.get(magic)
+
+    def get(self, magic):
+        try:
+            i = self.MAGICS.index(magic)
+        except ValueError:
+            raise KeyError(magic)
+        klass = PackKmp.packers[i].klass
+        if klass.FIELDS is None or klass.MAGIC == 'POTI':
+            raise ValueError('{} is not a fixed-stride section'.format(magic))
+        kmp = self.kmp
+        name = 'arrays ' + magic
+        sections = {getattr(type(kmp), PackKmp.attributes[x]).index for x in (i,) + PackKmp.references.get(i, ())}
+        array = kmp.get_derived(name, sections)
+        if array is None:
+            array = self.read(i) if kmp.unpacker is not None and i not in PackKmp.get_encoded(kmp) \
+                else self.encode(i)
+            array.flags.writeable = False
+            kmp.set_derived(name, sections, array)
+        return array
+
+    def read(self, i):
+        """Copies section i from the source bytes"""
+        n_entries, data = self.kmp.unpacker.get_section_data(i)
+        return np.frombuffer(data, get_dtype(PackKmp.packers[i].klass), n_entries).copy()
+
+    def encode(self, i):
+        """Encodes section i from the kmp nodes, leaving their indices as they were"""
+        kmp = self.kmp
+        with kmp.untracked():
+            needed = (i,) + PackKmp.references.get(i, ())
+            previous = [[getattr(x, 'index', None) for x in PackKmp.get_nodes(kmp, j)] for j in needed]
+            additional_values = list(kmp.additional_values)
+            sections = PackKmp.pre_packing(kmp, (i,))
+            binfile = BinFile(None, mode='w')
+            PackKmp.packers[i](sections[i], binfile, kmp.additional_values[i])
+            for j, indices in zip(needed, previous):
+                for x, index in zip(sections[j], indices):
+                    x.index = index
+            kmp.additional_values = additional_values
+        return np.frombuffer(binfile.file, get_dtype(PackKmp.packers[i].klass), len(sections[i]), 8).copy()
+
+    def positions(self, magic):
+        """(N, 3) float array of the section positions"""
+        return self.get(magic)['position'].astype(float)
+
+    def bounding_box(self, magic):
+        """The (min, max) corners of the section positions"""
+        positions = self.positions(magic)
+        if not len(positions):
+            return None
+        return positions.min(axis=0), positions.max(axis=0)
+
+    def nearest(self, magic, queries):
+        """Gets the index of the nearest section entry to each of queries (M, 3), and the distance to it"""
+        return nearest_points(queries, self.positions(magic))
@@ -1,12 +1,10 @@
 """Debugging and fixing"""
+import atexit
+import os
 import sys
 import traceback
+from queue import Queue, Empty
 from threading import Thread
-from time import sleep
-
-from colorama import init
-
-init()
 
 
 class bcolors:
@@ -39,7 +37,7 @@ class Bug:
 
     def resolve(self):
         self.is_resolved = True
-        AutoFix.info(f'(FIXED): {self.fix_des}', self.notify_level)
+        AutoFix.info('(FIXED): {}', self.notify_level, self.fix_des)
 
 
 class AutoFixAbort(BaseException):
@@ -66,6 +64,10 @@ class Message:
     def __init__(self, message):
         self.message = message
 
+    def format(self):
+        """The text printed for the message"""
+        raise NotImplementedError()
+
     def send(self, pipe):
         raise NotImplementedError()
 
@@ -87,58 +89,104 @@ class AutoFix:
     RESULTS = ('NONE', 'ERROR', 'WARN', 'CHECK', 'SUCCESS')
 
     class Info(Message):
+        def format(self):
+            return self.message
+
         def send(self, pipe):
-            message = self.message
-            print(message)
-            if pipe:
-                pipe.info(message)
+            pipe.info(self.message)
 
     class Warn(Message):
+        def format(self):
+            return f'{bcolors.FAIL}WARN: {self.message}{bcolors.ENDC}'
+
         def send(self, pipe):
-            message = self.message
-            print(f'{bcolors.FAIL}WARN: {message}{bcolors.ENDC}')
-            if pipe:
-                pipe.warn(message)
+            pipe.warn(self.message)
 
     class Error(Message):
+        def format(self):
+            return f'{bcolors.FAIL}ERROR: {self.message}{bcolors.ENDC}'
+
         def send(self, pipe):
-            message = self.message
-            print(f'{bcolors.FAIL}ERROR: {message}{bcolors.ENDC}')
-            if pipe:
-                pipe.error(message)
+            pipe.error(self.message)
 
     def __init__(self, fix_level=3, loudness=3):
         if self.__AUTO_FIXER: raise RuntimeError('Autofixer already initialized')
         self.loudness = loudness
         self.fix_level = fix_level
         self.zero_level_func = None
-        self.queue = []
-        self.is_running = False
+        self.queue = None
+        self.thread = None
+        self.pid = None     # process the consumer thread runs in
         self.pipe = None  # if set, output is sent to the pipe, must implement info warn and error.
+        self.stream = None  # output file, defaults to stdout
+        self.colorama_ready = False
         AutoFix.__AUTO_FIXER = self
+        atexit.register(self.flush)
 
     @staticmethod
     def quit():
         a = AutoFix.__AUTO_FIXER
         if a is not None:
             if a.is_running:
-                a.is_running = False
+                a.queue.put(None)
                 a.thread.join()
+                a.thread = None
                 AutoFix.__AUTO_FIXER = None
 
+    @property
+    def is_running(self):
+        return self.thread is not None and self.thread.is_alive() and self.pid == os.getpid()
+
     def run(self):
-        self.is_running = True
-        while len(self.queue):
-            if len(self.queue):
-                self.queue.pop(0).send(self.pipe)
-            sleep(0.01)
-        self.is_running = False
+        """Consumer thread, writing all waiting messages at once"""
+        queue = self.queue
+        while True:
+            batch = [queue.get()]
+            try:
+                while True:
+                    batch.append(queue.get_nowait())
+            except Empty:
+                pass
+            try:
+                self.write([x for x in batch if x is not None])
+            except Exception:   # a failing pipe or stream must not stop the consumer
+                traceback.print_exc()
+            finally:
+                for x in batch:
+                    queue.task_done()
+            if batch[-1] is None:
+                return
+
+    def write(self, messages):
+        if not messages:
+            return
+        if not self.colorama_ready:     # only set up once there is output
+            from colorama import init
+            init()
+            self.colorama_ready = True
+        stream = self.stream or sys.stdout
+        try:
+            stream.write('\n'.join([x.format() for x in messages]) + '\n')
+            stream.flush()
+        except (OSError, ValueError):     # closed stream
+            pass
+        pipe = self.pipe
+        if pipe:
+            for x in messages:
+                x.send(pipe)
 
     def enqueue(self, message):
-        self.queue.append(message)
-        if not self.is_running:
-            self.thread = Thread(target=self.run)
+        if not self.is_running:     # first message, or in a forked process
+            self.queue = Queue()
+            self.pid = os.getpid()
+            self.thread = Thread(target=self.run, name='AutoFix', daemon=True)
             self.thread.start()
+        self.queue.put(message)
+
+    def flush(self):
+        """Blocks until all queued messages are written"""
+        if self.is_running:
+            self.queue.join()
 
     @staticmethod
     def get(fixe_level=3, loudness=3):
@@ -149,6 +197,9 @@ class AutoFix:
     def set_pipe(self, obj):
         self.pipe = obj
 
+    def set_stream(self, stream):
+        self.stream = stream
+
     def set_fix_level(self, fix_level, zero_level_func=None):
         if zero_level_func:
             self.zero_level_func = zero_level_func
@@ -169,33 +220,45 @@ class AutoFix:
     def can_prompt(self):
         return self.fix_level == self.FIX_PROMPT
 
-    def log(self, message):
+    def is_loud(self, loudness):
+        """Whether messages of loudness are shown, nothing is at loudness 0 (silent)"""
+        return 0 < self.loudness >= loudness
+
+    @staticmethod
+    def render(message, args):
+        """Formats message with args, calling it first if it is callable"""
+        if callable(message):
+            message = message()
+        message = str(message)
+        return message.format(*args) if args else message
+
+    # Messages are only rendered if shown: AutoFix.warn('File {} exists', 1, filename) or AutoFix.info(callable)
+    def log(self, message, *args):
         if self.loudness >= 5:
-            self.enqueue(self.Info(str(message)))
+            self.enqueue(self.Info(self.render(message, args)))
 
-    def info(self, message, loudness=3):
-        if self.loudness >= loudness:
-            self.enqueue(self.Info(str(message)))
+    def info(self, message, loudness=3, *args):
+        if self.is_loud(loudness):
+            self.enqueue(self.Info(self.render(message, args)))
 
-    def warn(self, message, loudness=2):
-        if self.loudness >= loudness:
-            self.enqueue(self.Warn(str(message)))
+    def warn(self, message, loudness=2, *args):
+        if self.is_loud(loudness):
+            self.enqueue(self.Warn(self.render(message, args)))
 
-    def error(self, message, loudness=1):
-        if self.loudness >= loudness:
-            self.enqueue(self.Error(str(message)))
+    def error(self, message, loudness=1, *args):
+        if self.is_loud(loudness):
+            self.enqueue(self.Error(self.render(message, args)))
 
     def exception(self, exception=None, shutdown=False):
-        exc_type, exc_value, exc_tb = sys.exc_info()
-        if self.loudness >= 5:  # Debug level
-            s = traceback.format_exception(exc_type, exc_value, exc_tb)
-        elif self.loudness >= 1:
-            s = traceback.format_exception(exc_type, exc_value, exc_tb, 10)
-        else:
-            s = traceback.format_exception(exc_type, exc_value, exc_tb, 3)
-        self.enqueue(self.Error(''.join(s)))
+        if self.loudness:
+            exc_type, exc_value, exc_tb = sys.exc_info()
+            if self.loudness >= 5:  # Debug level
+                s = traceback.format_exception(exc_type, exc_value, exc_tb)
+            else:
+                s = traceback.format_exception(exc_type, exc_value, exc_tb, 10)
+            self.enqueue(self.Error(''.join(s)))
         if shutdown:
-            self.thread.join(5)
+            self.flush()
             sys.exit(-1)
 
     # def should_fix(self, bug):
@@ -1,6 +1,10 @@
 #!/usr/bin/python
 """ binary file read/writing operations """
+import mmap
+import os
+import stat
 import struct
+import uuid
 from struct import *
 
 
@@ -18,13 +22,16 @@ class PackingError(BaseException):
 class BinFile:
     """ BinFile class: for packing and unpacking binary files"""
     STRIDE_MAP = {'f':4, 'I':4, 'i':4, 'H':2, 'h':2, 'B':2, 'b':2}
+    STRUCTS = {}    # compiled struct cache, keyed by byte order + format
 
-    def __init__(self, filename, mode='r', bom='>'):
+    def __init__(self, filename, mode='r', bom='>', memory_map=False, data=None):
         """
         filename:   name of file to read/write
         bom:    byte order mark (>|<) Big endian or little endian
         mode:   (r|w)
         len:    initial length of file (write only)
+        memory_map: read the file through mmap instead of copying it (read only)
+        data:   bytes-like object to read from instead of the file (read only)
         """
         self.beginOffset = self.offset = 0
         self.filename = filename
@@ -37,25 +44,86 @@ class BinFile:
         self.lenMap = {}  # used for tracking length of files
         self.c_length = None  # for tracking current length
 
+        self.mmap = None
         self.isWriteMode = (mode == 'w')
-        if not self.isWriteMode:
+        if data is not None:
+            self.file = data
+        elif not self.isWriteMode:
             with open(filename, "rb") as file:
-                self.file = file.read()
+                if memory_map:
+                    try:
+                        self.mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+                    except ValueError:  # empty files can't be mapped
+                        pass
+                self.file = self.mmap if self.mmap is not None else file.read()
         else:
             self.file = bytearray()
         self.start()
 
-    def commit_write(self):
-        """ writes the file """
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        """ releases the file data, closing the memory map if there is one """
+        if self.mmap is not None:
+            self.mmap.close()
+            self.mmap = None
+        if not self.isWriteMode:
+            self.file = b''
+
+    def detach(self):
+        """ copies mapped or borrowed data into bytes and closes the memory map, the source is no longer used """
+        if not self.isWriteMode and type(self.file) is not bytes:
+            self.file = bytes(self.file)
+        if self.mmap is not None:
+            self.mmap.close()
+            self.mmap = None
+
+    def finish(self):
+        """ completes packing, returns the packed bytearray """
         # check references
         if len(self.stack) > 1:
             raise PackingError(self, 'Incorrect stack, {} items still on'.format(len(self.stack) - 1))
         if not self.names_packed:
             self.pack_names()
-        # write
+        return self.file
+
+    def commit_write(self, fsync=False):
+        """ writes the file, through a temporary file that replaces the destination once complete
+            fsync:  flush the data to disk before replacing
+        """
+        data = self.finish()
         # print('Length of file is {}'.format(len(self.file)))
-        with open(self.filename, "wb") as f:
-            f.write(self.file)
+        target = os.path.realpath(self.filename)     # write through symlinks, rather than replacing them
+        directory, name = os.path.split(target)
+        tmp = os.path.join(directory, '.{}.{}.tmp'.format(name, uuid.uuid4().hex[:8]))
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, 'O_BINARY', 0), 0o666)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(memoryview(data))
+                if fsync:
+                    f.flush()
+                    os.fsync(f.fileno())
+            try:
+                os.chmod(tmp, stat.S_IMODE(os.stat(target).st_mode))
+            except FileNotFoundError:
+                pass
+            os.replace(tmp, target)
+        except BaseException:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            raise
+        if fsync and hasattr(os, 'O_DIRECTORY'):    # persist the rename
+            fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
         return True
 
     def is_aligned(self, alignment=0x20):
@@ -95,7 +163,6 @@ class BinFile:
             offset = self.lenMap.get(self.beginOffset)
             if offset:
                 self.write_offset("I", offset, self.offset - self.beginOffset)
-            self.offset = len(self.file)
         else:  # read mode
             if self.c_length:
                 current_read_len = self.offset - self.beginOffset
@@ -301,11 +368,30 @@ class BinFile:
             self.advance(4)
         return magic[0].decode()
 
+    def get_struct(self, fmt):
+        """ gets the compiled struct for fmt in the file byte order """
+        key = self.bom + fmt
+        codec = self.STRUCTS.get(key)
+        if codec is None:
+            codec = self.STRUCTS[key] = Struct(key)
+        return codec
+
     def read(self, fmt, length):
-        read = unpack_from(self.bom + fmt, self.file, self.offset)
+        read = self.get_struct(fmt).unpack_from(self.file, self.offset)
         self.advance(length)
         return read
 
+    def read_array(self, fmt, count):
+        """ reads count consecutive entries of fmt in one pass, returns a list of tuples """
+        codec = self.get_struct(fmt)
+        start = self.offset
+        end = start + codec.size * count
+        if end > len(self.file):
+            raise UnpackingError(self, 'Array of {} {} entries runs past end of file'.format(count, fmt))
+        self.advance(end - start)
+        with memoryview(self.file) as view:
+            return list(codec.iter_unpack(view[start:end]))
+
     def read_matrix(self, width, height, fmt='f'):
         row_fmt = str(width) + fmt
         stride = self.STRIDE_MAP[fmt] * width
@@ -315,7 +401,7 @@ class BinFile:
         return matrix
 
     def read_offset(self, fmt, offset):  # len not needed
-        return unpack_from(self.bom + fmt, self.file, offset)
+        return self.get_struct(fmt).unpack_from(self.file, offset)
 
     def read_remaining(self, filelen=None):
         """ Reads and returns remaining data as bytes """
@@ -330,10 +416,21 @@ class BinFile:
     def write_magic(self, magic):
         self.write("4s", magic.encode('ascii'))
 
+    def reserve(self, length):
+        """ Allocates length bytes from the current offset up front (write mode) """
+        m = self.offset + length - len(self.file)
+        if m > 0:
+            self.file.extend(bytes(m))
+
     def write(self, fmt, *args):
-        """ Packs data onto end of file, shifting the offset"""
-        self.file.extend(pack(self.bom + fmt, *args))
-        self.offset = len(self.file)
+        """ Packs data at the current offset, shifting the offset"""
+        codec = self.get_struct(fmt)
+        offset = self.offset
+        self.offset += codec.size
+        m = self.offset - len(self.file)
+        if m > 0:
+            self.file.extend(bytes(m))
+        codec.pack_into(self.file, offset, *args)
         #- debug
         # to_remove = [x for x in self.target if self.offset >= x - 4]
         # for x in to_remove:
@@ -341,15 +438,27 @@ class BinFile:
         # return
         #- end debug
 
+    def write_array(self, fmt, rows):
+        """ Packs each row of values at consecutive offsets, shifting the offset """
+        codec = self.get_struct(fmt)
+        stride = codec.size
+        offset = self.offset
+        self.advance(stride * len(rows))
+        data = self.file
+        pack_into = codec.pack_into
+        for row in rows:
+            pack_into(data, offset, *row)
+            offset += stride
+
     def write_offset(self, fmt, offset, args):
         """ packs data at offset, must be less than file length """
-        pack_into(self.bom + fmt, self.file, offset, args)
+        self.get_struct(fmt).pack_into(self.file, offset, args)
 
     def write_remaining(self, data):
         """ writes the remaining bytes at current offset """
         length = len(data)
-        self.file.extend(data)
-        self.offset = len(self.file)
+        self.file[self.offset:self.offset + length] = data
+        self.offset += length
         return length
 
     def write_matrix(self, matrix, fmt='f'):
@@ -0,0 +1,106 @@
+"""Adjacency of the connected groups of a section (CKPH, ENPH, ITPH) by group index"""
+
+MAX_LINKS = 6   # previous or next groups of a group, as packed
+NO_LINK = 0xff
+
+
+class GroupGraph:
+    """Snapshot of the links between the groups of a section, by group index.
+
+    The groups' next_groups and prev_groups remain the link storage, the graph is built from them
+    (or from the packed rows) for packing, unpacking and checks. The links of each node are kept in
+    dicts used as ordered sets, dropping repeats while keeping the order the links are packed in.
+    """
+
+    def __init__(self, n_nodes=0):
+        self.next = [{} for i in range(n_nodes)]
+        self.prev = [{} for i in range(n_nodes)]
+
+    def __len__(self):
+        return len(self.next)
+
+    @classmethod
+    def from_groups(cls, groups):
+        """Builds the graph of groups from their next_groups and prev_groups"""
+        ids = {id(x): i for i, x in enumerate(groups)}
+        graph = cls(len(groups))
+        for i in range(len(groups)):
+            try:
+                graph.next[i] = dict.fromkeys([ids[id(x)] for x in groups[i].next_groups])
+                graph.prev[i] = dict.fromkeys([ids[id(x)] for x in groups[i].prev_groups])
+            except KeyError:
+                raise ValueError('{} group {} is linked to a group outside its section'.format(groups[i].MAGIC, i))
+        return graph
+
+    @classmethod
+    def from_links(cls, links):
+        """Builds the graph from the packed (prev_groups, next_groups) index rows of each group.
+
+        Unused (0xff) and out of range indices are skipped.
+        """
+        n = len(links)
+        graph = cls(n)
+        for i in range(n):
+            prev, next = links[i]
+            graph.prev[i] = dict.fromkeys([x for x in prev if 0 <= x < n])
+            graph.next[i] = dict.fromkeys([x for x in next if 0 <= x < n])
+        return graph
+
+    def apply(self, groups):
+        """Sets the next_groups and prev_groups of groups from the graph"""
+        for i in range(len(groups)):
+            groups[i].next_groups = [groups[x] for x in self.next[i]]
+            groups[i].prev_groups = [groups[x] for x in self.prev[i]]
+
+    def get_links(self, i):
+        """Gets the (prev_groups, next_groups) indices of node i as packed, padded to MAX_LINKS with 0xff"""
+        links = []
+        for linked in (self.prev[i], self.next[i]):
+            if len(linked) > MAX_LINKS:
+                raise ValueError('Group {} linked to {} groups, {} max'.format(i, len(linked), MAX_LINKS))
+            links.append(list(linked) + [NO_LINK] * (MAX_LINKS - len(linked)))
+        return links
+
+    def strongly_connected_components(self):
+        """Lists the strongly connected components (lists of node ids), with Tarjan's algorithm run iteratively"""
+        n = len(self.next)
+        index = [None] * n
+        low = [0] * n
+        on_stack = [False] * n
+        stack = []
+        components = []
+        counter = 0
+        for root in range(n):
+            if index[root] is not None:
+                continue
+            work = [(root, iter(self.next[root]))]
+            index[root] = low[root] = counter
+            counter += 1
+            stack.append(root)
+            on_stack[root] = True
+            while work:
+                node, children = work[-1]
+                for child in children:
+                    if index[child] is None:
+                        index[child] = low[child] = counter
+                        counter += 1
+                        stack.append(child)
+                        on_stack[child] = True
+                        work.append((child, iter(self.next[child])))
+                        break
+                    elif on_stack[child] and index[child] < low[node]:
+                        low[node] = index[child]
+                else:
+                    work.pop()
+                    if work and low[node] < low[work[-1][0]]:
+                        low[work[-1][0]] = low[node]
+                    if low[node] == index[node]:
+                        component = []
+                        while True:
+                            x = stack.pop()
+                            on_stack[x] = False
+                            component.append(x)
+                            if x == node:
+                                break
+                        components.append(component)
+        return components
@@ -29,20 +29,37 @@ class Packable:
     def rename(self, name):
         self.name = name
 
-    def save(self, filename=None, overwrite=None, check=True):
+    def to_buffer(self, check=True):
+        """Packs in memory, returning a memoryview of the packed bytes"""
+        if check:
+            self.check()
+        f = BinFile(self.name, mode="w")
+        self.pack(f)
+        return memoryview(f.finish())
+
+    def to_bytes(self, check=True):
+        return bytes(self.to_buffer(check))
+
+    def save(self, filename=None, overwrite=None, check=True, fsync=False):
+        """Packs and writes the file, the destination is only replaced once fully written
+            fsync: flush to disk before replacing the destination
+        """
         if not filename:
             filename = self.name
+        if not filename:
+            AutoFix.error('No file name to save to!', 1)
+            return False
         if overwrite is None:
             overwrite = self.overwrite
         if not overwrite and os.path.exists(filename):
-            AutoFix.error('File {} already exists!'.format(filename), 1)
+            AutoFix.error('File {} already exists!', 1, filename)
         else:
             if check:
                 self.check()
             f = BinFile(filename, mode="w")
             self.pack(f)
-            if f.commit_write():
-                AutoFix.info("Wrote file '{}'".format(filename), 2)
+            if f.commit_write(fsync):
+                AutoFix.info("Wrote file '{}'", 2, filename)
                 self.rename(filename)
                 return True
         return False
@@ -1,4 +1,5 @@
 import struct
+from time import perf_counter
 
 from akmpt.area import Area
 from akmpt.camera import Camera
@@ -13,6 +14,8 @@ from akmpt.respawn import Respawn
 from akmpt.route import Route, RoutePoint
 from akmpt.stage_info import StageInfo
 from akmpt.start_position import StartPosition
+from akmpt.lib import profiling
+from akmpt.lib.binfile import PackingError
 from akmpt.lib.indexing import rebuild_indexes, get_id
 from akmpt.lib.pack_interface import Packer
 
@@ -20,84 +23,84 @@ from akmpt.lib.pack_interface import Packer
 class PackArea(PackSection):
     klass = Area
 
-    def pack_data(self, area, binfile):
-        binfile.write(self.klass.FMT, area.shape, area.area_type,
-                      get_id(area.camera), area.priority,
-                      *area.position, *area.rotation, *area.scale, *area.settings,
-                      get_id(area.route), area.enemy_point_id, 0)
+    def pack_data(self, area):
+        return (area.shape, area.area_type,
+                get_id(area.camera), area.priority,
+                *area.position, *area.rotation, *area.scale, *area.settings,
+                get_id(area.route), area.enemy_point_id, 0)
 
 
 class PackCame(PackSection):
     klass = Camera
 
-    def pack_data(self, cam, binfile):
-        binfile.write(self.klass.FMT, cam.camera_type,
-                      get_id(cam.next_camera),
-                      cam.cam_shake,
-                      get_id(cam.route), cam.point_speed, cam.zoom_speed,
-                      cam.view_speed, cam.start, cam.movie,
-                      *cam.position, *cam.rotation, cam.zoom_start, cam.zoom_end,
-                      *cam.view_start_pos, *cam.view_end_pos, cam.time)
+    def pack_data(self, cam):
+        return (cam.camera_type,
+                get_id(cam.next_camera),
+                cam.cam_shake,
+                get_id(cam.route), cam.point_speed, cam.zoom_speed,
+                cam.view_speed, cam.start, cam.movie,
+                *cam.position, *cam.rotation, cam.zoom_start, cam.zoom_end,
+                *cam.view_start_pos, *cam.view_end_pos, cam.time)
 
 
 class PackCkpt(PackSection):
     klass = CheckPoint
 
-    def pack_data(self, checkpoint, binfile):
-        binfile.write(self.klass.FMT, *checkpoint.left_pole, *checkpoint.right_pole,
-                      get_id(checkpoint.respawn),
-                      checkpoint.key, get_id(checkpoint.previous), get_id(checkpoint.next))
+    def pack_data(self, checkpoint):
+        return (*checkpoint.left_pole, *checkpoint.right_pole,
+                get_id(checkpoint.respawn),
+                checkpoint.key, get_id(checkpoint.previous), get_id(checkpoint.next))
 
 
 class PackCnpt(PackSection):
     klass = Cannon
 
-    def pack_data(self, cannon, binfile):
-        binfile.write(self.klass.FMT, *cannon.position, *cannon.rotation, cannon.index, cannon.shoot_effect)
+    def pack_data(self, cannon):
+        return (*cannon.position, *cannon.rotation, cannon.index, cannon.shoot_effect)
 
 
 class PackEnpt(PackSection):
     klass = CpuRoutePoint
 
-    def pack_data(self, point, binfile):
-        binfile.write(self.klass.FMT, *point.position, point.width, *point.settings)
+    def pack_data(self, point):
+        return (*point.position, point.width, *point.settings)
 
 
 class PackGobj(PackSection):
     klass = GameObject
 
-    def pack_data(self, object, binfile):
-        binfile.write(self.klass.FMT, object.id, object.extended_presence, *object.position,
-                      *object.rotation, *object.scale, get_id(object.route, 0xffff),
-                      *object.settings, object.presence)
+    def pack_data(self, object):
+        return (object.id, object.extended_presence, *object.position,
+                *object.rotation, *object.scale, get_id(object.route, 0xffff),
+                *object.settings, object.presence)
 
 
 class PackItpt(PackSection):
     klass = ItemRoutePoint
 
-    def pack_data(self, point, binfile):
-        binfile.write(self.klass.FMT, *point.position, point.width, *point.settings)
+    def pack_data(self, point):
+        return (*point.position, point.width, *point.settings)
 
 
 class PackJgpt(PackSection):
     klass = Respawn
 
-    def pack_data(self, node, binfile):
-        binfile.write(self.klass.FMT, *node.position, *node.rotation, node.index, node.range)
+    def pack_data(self, node):
+        return (*node.position, *node.rotation, node.index, node.range)
 
 
 class PackKtpt(PackSection):
     klass = StartPosition
 
-    def pack_data(self, node, binfile):
-        binfile.write(self.klass.FMT, *node.position, *node.rotation, node.player_id, 0)
+    def pack_data(self, node):
+        return (*node.position, *node.rotation, node.player_id, 0)
 
 
 class PackMspt(PackSection):
     klass = EndPosition
 
-    def pack_data(self, node, binfile):
-        binfile.write(self.klass.FMT, *node.position, *node.rotation, node.index, node.unknown)
+    def pack_data(self, node):
+        return (*node.position, *node.rotation, node.index, node.unknown)
 
 
 class PackPoti(PackSection):
@@ -106,19 +109,23 @@ class PackPoti(PackSection):
     def get_added_value(self):
         return sum([len(x) for x in self.node])
 
-    def pack_data(self, route, binfile):
-        binfile.write(self.klass.FMT, len(route), *route.settings)
-        for point in route:
-            binfile.write(RoutePoint.FMT, *point.position, point.speed, point.setting)
+    @classmethod
+    def byte_size(cls, nodes):
+        return super().byte_size(nodes) + sum([len(x) for x in nodes]) * RoutePoint.BYTE_LEN
+
+    def pack_entries(self, nodes, binfile):
+        for route in nodes:
+            binfile.write(self.klass.FMT, len(route), *route.settings)
+            binfile.write_array(RoutePoint.FMT, [(*point.position, point.speed, point.setting) for point in route])
 
 
 class PackStgi(PackSection):
     klass = StageInfo
 
-    def pack_data(self, node, binfile):
+    def pack_data(self, node):
         b = struct.pack('f', node.speed_mod)
-        binfile.write(self.klass.FMT, node.lap_count, node.pole_position_right, node.narrow, node.lens_flashing,
-                      0, *node.flare_color, 0, b[0], b[1])
+        return (node.lap_count, node.pole_position_right, node.narrow, node.lens_flashing,
+                0, *node.flare_color, 0, b[0], b[1])
 
        
 class PackKmp(Packer):
@@ -126,34 +133,109 @@ class PackKmp(Packer):
                PackGobj, PackPoti, PackArea, PackCame, PackJgpt, PackCnpt, PackMspt,
                PackStgi]
 
-    @staticmethod
-    def build_point_group(groups_collection):
-        return [[x for group in groups for x in group]
-                for groups in groups_collection]
-
-    def pre_packing(self, kmp):
-        enpt, itpt, ckpt = self.build_point_group((kmp.cpu_routes, kmp.item_routes, kmp.check_points))
-        sections = [kmp.start_positions, enpt, kmp.cpu_routes, itpt, kmp.item_routes,
-                ckpt, kmp.check_points, kmp.game_objects, kmp.routes, kmp.areas, kmp.cameras,
-                kmp.respawns, kmp.cannons, kmp.end_positions, kmp.stage_info]
-        for x in sections:
-            rebuild_indexes(x)
-        # update came opening cam values
-        kmp.additional_values[10] = get_id(kmp.pan_cam, 0xff) << 8 | get_id(kmp.movie_cam, 0xff)
+    # kmp attribute of each section, the point sections are flattened from their groups
+    attributes = ['start_positions', 'cpu_routes', 'cpu_routes', 'item_routes', 'item_routes',
+                  'check_points', 'check_points', 'game_objects', 'routes', 'areas', 'cameras',
+                  'respawns', 'cannons', 'end_positions', 'stage_info']
+    point_sections = (1, 3, 5)
+    # sections packed with indices into other sections
+    references = {2: (1,), 4: (3,), 5: (11,), 6: (5,), 7: (8,), 9: (8, 10), 10: (8,)}
+    # sections to re-encode along with a modified section: its referrers, and group/point pairs.
+    # The sections it references are re-encoded too, as they may have been edited through it
+    affects = {1: (2,), 2: (1,), 3: (4,), 4: (3,), 5: (6,), 6: (5,), 8: (7, 9, 10), 10: (9,), 11: (5,)}
+
+    @classmethod
+    def get_nodes(cls, kmp, i):
+        """The nodes of section i, in packed order"""
+        nodes = getattr(kmp, cls.attributes[i])
+        if i in cls.point_sections:
+            nodes = [x for group in nodes for x in group]
+        return nodes
+
+    @classmethod
+    def pre_packing(cls, kmp, indices=None):
+        """Rebuilds the indices of the nodes of sections (all by default) and those they reference.
+
+        Returns the node list of each section, None for sections not needed.
+        """
+        if indices is None:
+            indices = range(15)
+        needed = set(indices)
+        for i in indices:
+            needed.update(cls.references.get(i, ()))
+        sections = [None] * 15
+        for i in sorted(needed):
+            nodes = cls.get_nodes(kmp, i)
+            rebuild_indexes(nodes)
+            sections[i] = nodes
+        if 10 in indices:
+            # update came opening cam values
+            kmp.additional_values[10] = get_id(kmp.pan_cam, 0xff) << 8 | get_id(kmp.movie_cam, 0xff)
         return sections
 
+    @classmethod
+    def get_encoded(cls, kmp):
+        """Gets the sections to encode, the rest are copied from the source kmp bytes.
+
+        These are the dirty sections, and those they affect or reference, transitively.
+        """
+        if kmp.unpacker is None:
+            return set(range(15))
+        encoded = set()
+        stack = list(kmp.dirty)
+        while stack:
+            i = stack.pop()
+            if i not in encoded:
+                encoded.add(i)
+                stack.extend(cls.affects.get(i, ()))
+                stack.extend(cls.references.get(i, ()))
+        return encoded
+
+    HEADER_LEN = 0x4c
+
+    @classmethod
+    def byte_size(cls, sections):
+        return cls.HEADER_LEN + sum([cls.packers[i].byte_size(sections[i]) for i in range(15)])
+
     def pack(self, kmp, binfile):
-        sections = self.pre_packing(kmp)
-        offset = binfile.start()
-        binfile.write_magic(kmp.MAGIC)
-        binfile.mark_len()
-        binfile.write('2HI', 15, 0x4c, kmp.version)
-        binfile.mark(15)
-        binfile.beginOffset = len(binfile.file)     # offsets from header end
-        for i in range(15):
-            binfile.create_ref()
-            self.packers[i](sections[i], binfile, kmp.additional_values[i])
+        profiler = profiling.active
+        start = perf_counter()
+        encoded = self.get_encoded(kmp)
+        sections = self.pre_packing(kmp, encoded)
+        if profiler is not None:
+            profiler.record(kmp.MAGIC, 'pre_pack', start, sum([len(x) for x in sections if x is not None]), 0)
+        copied = {i: kmp.unpacker.get_section_data(i) for i in range(15) if i not in encoded}
+        try:
+            offset = binfile.start()
+            size = self.HEADER_LEN + sum([self.packers[i].byte_size(sections[i]) if i in encoded
+                                          else 8 + len(copied[i][1]) for i in range(15)])
+            binfile.reserve(size)   # allocate once, records are packed in place
+            binfile.write_magic(kmp.MAGIC)
+            binfile.mark_len()
+            binfile.write('2HI', 15, self.HEADER_LEN, kmp.version)
+            binfile.mark(15)
+            binfile.beginOffset = binfile.offset     # offsets from header end
+            for i in range(15):
+                start = perf_counter()
+                binfile.create_ref()
+                section_offset = binfile.offset
+                if i in encoded:
+                    self.packers[i](sections[i], binfile, kmp.additional_values[i])
+                    n_entries = len(sections[i])
+                else:
+                    n_entries, data = copied[i]
+                    binfile.write_magic(self.packers[i].klass.MAGIC)
+                    binfile.write('2H', n_entries, kmp.additional_values[i])
+                    binfile.write_remaining(data)
+                if profiler is not None:
+                    profiler.record(self.packers[i].klass.MAGIC, 'pack' if i in encoded else 'copy', start,
+                                    n_entries, binfile.offset - section_offset)
+        finally:
+            for n_entries, data in copied.values():
+                data.release()
         binfile.beginOffset = offset
         binfile.end()
+        if binfile.offset - offset != size:
+            raise PackingError(binfile, 'Packed {} bytes, expected {}'.format(binfile.offset - offset, size))
 
 
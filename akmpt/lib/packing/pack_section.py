@@ -2,6 +2,7 @@ from akmpt.checkpoint import CheckPointGroup
 from akmpt.cpu_route import CpuRoute
 from akmpt.item_route import ItemRoute
 from akmpt.lib.binfile import PackingError
+from akmpt.lib.graph import GroupGraph
 from akmpt.lib.pack_interface import Packer
 
 
@@ -12,32 +13,39 @@ class PackSection(Packer):
         self.added_value = added_value
         super().__init__(node, binfile)
 
-    def pack_data(self, node, binfile):
+    def pack_data(self, node):
+        """Gets the tuple of values to pack for node"""
         raise NotImplementedError()
 
+    @classmethod
+    def byte_size(cls, nodes):
+        """Packed size of the section, including the 8 byte section header"""
+        return 8 + len(nodes) * cls.klass.BYTE_LEN
+
     def pack(self, nodes, binfile):
         binfile.write_magic(self.klass.MAGIC)
         binfile.write('2H', len(nodes), self.added_value)
-        for n in nodes:
-            self.pack_data(n, binfile)
+        self.pack_entries(nodes, binfile)
+
+    def pack_entries(self, nodes, binfile):
+        binfile.write_array(self.klass.FMT, [self.pack_data(n) for n in nodes])
 
 
 class PackHeader(PackSection):
-    @staticmethod
-    def __get_links(items, binfile):
-        indices = [x.index for x in items]
-        if len(indices) < 6:
-            indices.extend([0xff] * (6 - len(indices)))
-        elif len(indices) > 6:
-            raise PackingError(binfile, '{} linked to {} groups, {} max'.format(items[0].MAGIC, len(indices), 6))
-        return indices
-
-    def pack_data(self, node, binfile):
+    def pack_entries(self, nodes, binfile):
+        try:
+            self.graph = GroupGraph.from_groups(nodes)
+        except ValueError as e:
+            raise PackingError(binfile, str(e))
+        super().pack_entries(nodes, binfile)
+
+    def pack_data(self, node):
         start = node[0].index if len(node) else 0xff
-        binfile.write(self.klass.FMT, start, len(node),
-                      *self.__get_links(node.prev_groups, binfile),
-                      *self.__get_links(node.next_groups, binfile),
-                      *node.settings)
+        try:
+            prev, next = self.graph.get_links(node.index)
+        except ValueError as e:
+            raise PackingError(self.binfile, '{} {}'.format(node.MAGIC, e))
+        return (start, len(node), *prev, *next, *node.settings)
 
 
 class PackCkph(PackHeader):
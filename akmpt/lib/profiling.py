@@ -0,0 +1,63 @@
+"""Per-section timing of kmp unpacking and packing"""
+import cProfile
+from contextlib import contextmanager
+from time import perf_counter
+
+active = None   # the SectionProfiler recording, if any
+
+
+class SectionProfiler:
+    """Records the wall time, entry count, and bytes of each section phase.
+
+    Phases are unpack (decoding the entries), post_unpack (resolving references),
+    pre_pack (rebuilding indices), pack (encoding), and copy (splicing an untouched section).
+    """
+
+    def __init__(self):
+        self.records = []   # (magic, phase, seconds, entries, bytes)
+
+    def record(self, magic, phase, start, entries, n_bytes):
+        """Records a phase begun at perf_counter() start"""
+        self.records.append((magic, phase, perf_counter() - start, entries, n_bytes))
+
+    def summary(self):
+        """Totals by (magic, phase), in order of first record: [calls, seconds, entries, bytes]"""
+        totals = {}
+        for magic, phase, seconds, entries, n_bytes in self.records:
+            total = totals.get((magic, phase))
+            if total is None:
+                totals[(magic, phase)] = [1, seconds, entries, n_bytes]
+            else:
+                total[0] += 1
+                total[1] += seconds
+                total[2] += entries
+                total[3] += n_bytes
+        return totals
+
+    def format(self):
+        lines = ['section phase       calls        ms  entries    bytes  us/entry']
+        for (magic, phase), (calls, seconds, entries, n_bytes) in self.summary().items():
+            lines.append('{:7} {:11} {:5} {:9.3f} {:8} {:8} {:>9}'.format(
+                magic, phase, calls, seconds * 1e3, entries, n_bytes,
+                '{:.2f}'.format(seconds * 1e6 / entries) if entries else ''))
+        total = sum([x[2] for x in self.records])
+        lines.append('total {:.3f} ms'.format(total * 1e3))
+        return '\n'.join(lines)
+
+
+@contextmanager
+def profiling(pstats_file=None):
+    """Profiles the sections unpacked and packed within, optionally dumping cProfile stats to pstats_file"""
+    global active
+    previous = active
+    profiler = active = SectionProfiler()
+    cprofile = cProfile.Profile() if pstats_file else None
+    try:
+        if cprofile:
+            cprofile.enable()
+        yield profiler
+    finally:
+        if cprofile:
+            cprofile.disable()
+            cprofile.dump_stats(pstats_file)
+        active = previous
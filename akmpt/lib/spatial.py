@@ -0,0 +1,150 @@
+"""Spatial index over the connected segments of route groups"""
+import math
+from collections import namedtuple
+
+import numpy as np
+
+from akmpt.geometry import nearest_segments
+
+SegmentHit = namedtuple('SegmentHit', 'start end t position distance')
+
+
+def get_segments(groups):
+    """Gets the (start, end) point pairs of groups, including the links from each group to its next groups.
+
+    A lone point, linked to no other group, is a zero length segment.
+    """
+    segments = []
+    for group in groups:
+        points = group.points
+        if not points:
+            continue
+        for i in range(1, len(points)):
+            segments.append((points[i - 1], points[i]))
+        last = points[-1]
+        for x in group.next_groups:
+            if x.points:
+                segments.append((last, x.points[0]))
+        if len(points) == 1 and not group.next_groups and not group.prev_groups:
+            segments.append((last, last))
+    return segments
+
+
+class SegmentIndex:
+    """Uniform grid on the xz plane of the segments of route groups, for nearest segment queries.
+
+    Each cell lists the segments whose bounding box overlaps it, queries search rings of cells outward
+    from the point until no closer segment can remain. The index is a snapshot, rebuild it after editing the groups.
+    """
+
+    def __init__(self, groups, cell_size=None):
+        self.segments = get_segments(groups)
+        self.starts = []
+        self.deltas = []
+        self.cells = {}
+        if not self.segments:
+            return
+        for start, end in self.segments:
+            s = start.position
+            e = end.position
+            self.starts.append((s[0], s[1], s[2]))
+            self.deltas.append((e[0] - s[0], e[1] - s[1], e[2] - s[2]))
+        xs = [x[0] for x in self.starts] + [x[0] + d[0] for x, d in zip(self.starts, self.deltas)]
+        zs = [x[2] for x in self.starts] + [x[2] + d[2] for x, d in zip(self.starts, self.deltas)]
+        self.min_x = min(xs)
+        self.min_z = min(zs)
+        if cell_size is None:
+            extent = max(max(xs) - self.min_x, max(zs) - self.min_z)
+            cell_size = extent / (2 * math.sqrt(len(self.segments))) or 1.0
+        self.cell_size = cell_size
+        self.n_x = self.get_cell(max(xs), self.min_x) + 1
+        self.n_z = self.get_cell(max(zs), self.min_z) + 1
+        for i in range(len(self.segments)):
+            self.insert(i)
+
+    def __len__(self):
+        return len(self.segments)
+
+    def get_cell(self, value, minimum):
+        return int(math.floor((value - minimum) / self.cell_size))
+
+    def insert(self, i):
+        (x, y, z), (dx, dy, dz) = self.starts[i], self.deltas[i]
+        x0 = self.get_cell(min(x, x + dx), self.min_x)
+        x1 = self.get_cell(max(x, x + dx), self.min_x)
+        z0 = self.get_cell(min(z, z + dz), self.min_z)
+        z1 = self.get_cell(max(z, z + dz), self.min_z)
+        cells = self.cells
+        for cx in range(x0, x1 + 1):
+            for cz in range(z0, z1 + 1):
+                cell = cells.get((cx, cz))
+                if cell is None:
+                    cells[(cx, cz)] = [i]
+                else:
+                    cell.append(i)
+
+    def get_ring(self, cx, cz, r):
+        """The cells of the grid at chebyshev distance r from (cx, cz)"""
+        if r == 0:
+            return [(cx, cz)]
+        xs = range(max(cx - r, 0), min(cx + r, self.n_x - 1) + 1)
+        zs = range(max(cz - r + 1, 0), min(cz + r - 1, self.n_z - 1) + 1)
+        ring = []
+        if cz - r >= 0:
+            ring.extend([(x, cz - r) for x in xs])
+        if cz + r < self.n_z:
+            ring.extend([(x, cz + r) for x in xs])
+        if cx - r >= 0:
+            ring.extend([(cx - r, z) for z in zs])
+        if cx + r < self.n_x:
+            ring.extend([(cx + r, z) for z in zs])
+        return ring
+
+    def nearest(self, point):
+        """Gets the SegmentHit of the segment nearest point (3d distance), None if there are no segments"""
+        if not self.segments:
+            return None
+        px, py, pz = point[0], point[1], point[2]
+        cx = self.get_cell(px, self.min_x)
+        cz = self.get_cell(pz, self.min_z)
+        first_ring = max(0, -cx, cx - self.n_x + 1, -cz, cz - self.n_z + 1)   # nearest ring within the grid
+        last_ring = max(abs(cx), abs(cx - self.n_x + 1), abs(cz), abs(cz - self.n_z + 1))
+        cells = self.cells
+        starts, deltas = self.starts, self.deltas
+        seen = set()
+        best = None
+        best_d2 = math.inf
+        for r in range(first_ring, last_ring + 1):
+            # cells of ring r are at least (r - 1) cells away on the xz plane
+            if r > 0 and ((r - 1) * self.cell_size) ** 2 >= best_d2:
+                break
+            for key in self.get_ring(cx, cz, r):
+                cell = cells.get(key)
+                if cell is None:
+                    continue
+                for i in cell:
+                    if i in seen:
+                        continue
+                    seen.add(i)
+                    (sx, sy, sz), (dx, dy, dz) = starts[i], deltas[i]
+                    dd = dx * dx + dy * dy + dz * dz
+                    t = ((px - sx) * dx + (py - sy) * dy + (pz - sz) * dz) / dd if dd else 0.0
+                    t = 0.0 if t < 0 else 1.0 if t > 1 else t
+                    qx, qy, qz = sx + t * dx, sy + t * dy, sz + t * dz
+                    d2 = (px - qx) ** 2 + (py - qy) ** 2 + (pz - qz) ** 2
+                    if d2 < best_d2:
+                        best_d2 = d2
+                        best = (i, t, (qx, qy, qz))
+        i, t, position = best
+        start, end = self.segments[i]
+        return SegmentHit(start, end, t, position, math.sqrt(best_d2))
+
+    def nearest_all(self, points):
+        """Gets the SegmentHit nearest each of points (M, 3), comparing all at once rather than through the grid"""
+        if not self.segments:
+            return [None] * len(points)
+        starts = np.array(self.starts)
+        indices, t, positions, distances = nearest_segments(points, starts, starts + np.array(self.deltas))
+        segments = self.segments
+        return [SegmentHit(segments[i][0], segments[i][1], float(t[j]), tuple(positions[j].tolist()),
+                           float(distances[j])) for j, i in enumerate(indices.tolist())]
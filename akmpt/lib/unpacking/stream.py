@@ -0,0 +1,84 @@
+"""Streaming access to kmp section entries, without building the Kmp object graph"""
+import os
+from collections import namedtuple
+
+from akmpt.lib.arrays import get_fields
+from akmpt.lib.binfile import BinFile, UnpackingError
+from akmpt.lib.unpacking.unpack_kmp import UnpackKmp, UnpackPoti
+from akmpt.route import RoutePoint
+
+_RECORDS = {}
+
+
+def record_type(klass):
+    """Gets the named tuple type for klass entries, multi-value fields are grouped as tuples"""
+    record = _RECORDS.get(klass)
+    if record is None:
+        fields = get_fields(klass)
+        record = namedtuple(klass.__name__ + 'Record', [name for name, codes in fields])
+        slices = []
+        i = 0
+        for name, codes in fields:
+            slices.append(i if len(codes) == 1 else slice(i, i + len(codes)))
+            i += len(codes)
+        record.from_values = lambda x, s=slices, r=record: r._make([x[i] for i in s])
+        _RECORDS[klass] = record
+    return record
+
+
+def _open_source(source):
+    if isinstance(source, BinFile):
+        return source
+    if isinstance(source, (str, os.PathLike)):
+        return BinFile(source, memory_map=True)
+    return BinFile('<buffer>', data=source)
+
+
+def _iter_entries(binfile, fmt, start, count, named_type):
+    codec = binfile.get_struct(fmt)
+    end = start + codec.size * count
+    if end > len(binfile.file):
+        raise UnpackingError(binfile, '{} entries run past end of file'.format(fmt))
+    view = memoryview(binfile.file)
+    try:
+        if named_type is None:
+            yield from codec.iter_unpack(view[start:end])
+        else:
+            from_values = named_type.from_values
+            for x in codec.iter_unpack(view[start:end]):
+                yield from_values(x)
+    finally:
+        view.release()
+
+
+def iter_section(source, magic, named=False):
+    """Yields the entries of a kmp section straight from the file bytes.
+
+    source: file name, bytes-like object, or BinFile
+    magic:  section magic, such as 'GOBJ'
+    named:  yield named records instead of the raw decoded tuples
+    POTI yields (route, points) pairs, the points being a list.
+    """
+    index = [x.klass.MAGIC for x in UnpackKmp.unpackers].index(magic)
+    klass = UnpackKmp.unpackers[index].klass
+    binfile = _open_source(source)
+    try:
+        version, base, offsets = UnpackKmp.read_section_table(binfile)
+        offset = base + offsets[index]
+        binfile.offset = offset
+        if binfile.read_magic() != magic:
+            raise UnpackingError(binfile, 'Wrong section magic at {}'.format(offset))
+        n, added_value = binfile.read('2H', 4)
+        if klass is not UnpackPoti.klass:
+            yield from _iter_entries(binfile, klass.FMT, offset + 8, n, record_type(klass) if named else None)
+        else:
+            point_type = record_type(RoutePoint) if named else None
+            route_type = record_type(klass) if named else None
+            for i in range(n):
+                route = binfile.read(klass.FMT, klass.BYTE_LEN)
+                points = list(_iter_entries(binfile, RoutePoint.FMT, binfile.offset, route[0], point_type))
+                binfile.offset += route[0] * RoutePoint.BYTE_LEN
+                yield (route_type.from_values(route) if named else route), points
+    finally:
+        if binfile is not source:
+            binfile.close()
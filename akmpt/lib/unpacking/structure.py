@@ -0,0 +1,82 @@
+"""Structure-only validation of kmp files, reading the headers without unpacking the entries"""
+import struct
+from collections import namedtuple
+
+from akmpt.lib.binfile import UnpackingError
+from akmpt.lib.unpacking.unpack_kmp import UnpackKmp
+
+SectionInfo = namedtuple('SectionInfo', 'index magic offset size n_entries additional_value')
+
+
+class KmpStructure:
+    """The kmp header and section layout, problems found are listed rather than raised"""
+    HEADER_LEN = 0x10
+
+    def __init__(self, binfile):
+        self.filename = binfile.filename
+        self.size = len(binfile.file)
+        self.length = self.version = None
+        self.sections = []
+        self.problems = []
+        self.warnings = []
+        self.read(binfile)
+
+    @property
+    def is_valid(self):
+        return not self.problems
+
+    def read(self, binfile):
+        if self.size < self.HEADER_LEN:
+            self.problems.append('Truncated header, file is {} bytes'.format(self.size))
+            return
+        try:
+            self.version, base, offsets = UnpackKmp.read_section_table(binfile)
+        except UnpackingError as e:
+            self.problems.append(str(e))
+            return
+        except struct.error:
+            self.problems.append('Truncated section table')
+            return
+        [self.length] = binfile.read_offset('I', 4)
+        if self.length > self.size:
+            self.problems.append('Truncated, header length {:#x} is past end of file {:#x}'.format(self.length, self.size))
+        elif self.length < self.size:
+            self.warnings.append('{:#x} bytes after end of kmp'.format(self.size - self.length))
+        if len(offsets) != len(UnpackKmp.unpackers):
+            self.warnings.append('{} sections, expected {}'.format(len(offsets), len(UnpackKmp.unpackers)))
+        for i in range(len(offsets)):
+            self.read_section(binfile, i, base, base + offsets[i])
+        self.check_overlap(base)
+
+    def read_section(self, binfile, index, base, offset):
+        unpacker = UnpackKmp.unpackers[index]
+        if offset + 8 > self.size:
+            self.problems.append('Section {} ({}) at {:#x} is past end of file'.format(
+                index, unpacker.klass.MAGIC, offset))
+            return
+        magic = bytes(binfile.file[offset:offset + 4]).decode('ascii', 'replace')
+        if magic != unpacker.klass.MAGIC:
+            self.problems.append('Section {} at {:#x} has magic {!r}, expected {}'.format(
+                index, offset, magic, unpacker.klass.MAGIC))
+        n_entries, additional_value = binfile.read_offset('2H', offset + 4)
+        try:
+            size = 8 + unpacker.entries_size(binfile, offset + 8, n_entries)
+        except struct.error:
+            size = self.size - offset
+            self.problems.append('{} route headers run past end of file'.format(magic))
+        else:
+            if offset + size > self.size:
+                self.problems.append('Truncated {}, {} entries end at {:#x} past end of file'.format(
+                    magic, n_entries, offset + size))
+        self.sections.append(SectionInfo(index, magic, offset, size, n_entries, additional_value))
+
+    def check_overlap(self, base):
+        previous = None
+        for x in sorted(self.sections, key=lambda x: x.offset):
+            magic = UnpackKmp.unpackers[x.index].klass.MAGIC
+            if x.offset < base:
+                self.problems.append('{} at {:#x} overlaps the header'.format(magic, x.offset))
+            elif previous is not None and previous.offset + previous.size > x.offset:
+                self.problems.append('{} overlaps {} at {:#x}'.format(
+                    UnpackKmp.unpackers[previous.index].klass.MAGIC, magic, x.offset))
+            previous = x
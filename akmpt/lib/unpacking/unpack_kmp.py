@@ -1,4 +1,5 @@
 import struct
+from time import perf_counter
 
 from akmpt.area import Area
 from akmpt.camera import Camera
@@ -14,6 +15,7 @@ from akmpt.route import Route, RoutePoint
 from akmpt.stage_info import StageInfo
 from akmpt.start_position import StartPosition
 from akmpt.lib.binfile import UnpackingError
+from akmpt.lib import profiling
 from akmpt.lib.unpack_interface import Unpacker
 
 
@@ -31,8 +33,7 @@ class UnpackCame(UnpackSection):
         self.node.pan_cam = self.resolve(self.nodes, pan_cam)
         self.node.movie_cam = self.resolve(self.nodes, movie_cam)
 
-    def unpack_data(self, binfile):
-        x = super().unpack_data(binfile)
+    def unpack_data(self, x):
         return Camera(x[0], x[1], x[2], x[3], x[4], x[5], x[6], x[7], x[8],
                       x[9:12], x[12:15], x[15], x[16], x[17:20], x[20:23], x[23])
 
@@ -67,8 +68,7 @@ class UnpackCkpt(UnpackSection):
             n.respawn = self.resolve(respawns, n.respawn)
         return self.nodes
 
-    def unpack_data(self, binfile):
-        x = super().unpack_data(binfile)
+    def unpack_data(self, x):
         return CheckPoint(x[0:2], x[2:4], x[4], x[5], x[6], x[7])
 
 
@@ -93,8 +93,7 @@ class UnpackEnph(UnpackHead):
 class UnpackEnpt(UnpackSection):
     klass = CpuRoutePoint
 
-    def unpack_data(self, binfile):
-        x = super().unpack_data(binfile)
+    def unpack_data(self, x):
         return CpuRoutePoint(x[0:3], x[3], [x[4], x[5], x[6]])
 
 
@@ -108,8 +107,7 @@ class UnpackGobj(UnpackSection):
             n.name = ID_TO_NAME[n.id]
         self.node.game_objects = self.nodes
 
-    def unpack_data(self, binfile):
-        x = super().unpack_data(binfile)
+    def unpack_data(self, x):
         return GameObject(x[0], x[1], x[2:5], x[5:8], x[8:11], x[11], x[12:20], x[20])
 
 
@@ -123,8 +121,7 @@ class UnpackItph(UnpackHead):
 class UnpackItpt(UnpackSection):
     klass = ItemRoutePoint
 
-    def unpack_data(self, binfile):
-        x = super().unpack_data(binfile)
+    def unpack_data(self, x):
         return ItemRoutePoint(x[0:3], x[3], x[4:])
 
 
@@ -134,8 +131,7 @@ class UnpackJgpt(UnpackSection):
     def post_unpack(self, args):
         self.node.respawns = self.nodes
 
-    def unpack_data(self, binfile):
-        x = super().unpack_data(binfile)
+    def unpack_data(self, x):
         return Respawn(x[0:3], x[3:6], x[7])
 
 
@@ -145,8 +141,7 @@ class UnpackKtpt(UnpackSection):
     def post_unpack(self, args):
         self.node.start_positions = self.nodes
 
-    def unpack_data(self, binfile):
-        x = super().unpack_data(binfile)
+    def unpack_data(self, x):
         return StartPosition(x[0:3], x[3:6], x[6])
 
 
@@ -163,13 +158,20 @@ class UnpackPoti(UnpackSection):
     def post_unpack(self, args):
         self.node.routes = self.nodes
 
-    def unpack_data(self, binfile):
-        n, s1, s2 = super().unpack_data(binfile)
-        p = []
-        for i in range(n):
-            x = binfile.read(RoutePoint.FMT, RoutePoint.BYTE_LEN)
-            p.append(RoutePoint(x[0:3], x[3], x[4]))
-        return Route(p, [s1, s2])
+    @classmethod
+    def entries_size(cls, binfile, offset, n_entries):
+        end = offset
+        for i in range(n_entries):
+            end += cls.klass.BYTE_LEN + binfile.read_offset('H', end)[0] * RoutePoint.BYTE_LEN
+        return end - offset
+
+    def unpack_entries(self, binfile):
+        routes = []
+        for i in range(self.n_entries):
+            n, s1, s2 = binfile.read(self.klass.FMT, self.klass.BYTE_LEN)
+            p = [RoutePoint(x[0:3], x[3], x[4]) for x in binfile.read_array(RoutePoint.FMT, n)]
+            routes.append(Route(p, [s1, s2]))
+        return routes
 
 
 class UnpackStgi(UnpackSection):
@@ -178,43 +180,83 @@ class UnpackStgi(UnpackSection):
     def post_unpack(self, args):
         self.node.stage_info = self.nodes
 
-    def unpack_data(self, binfile):
-        x = super().unpack_data(binfile)
+    def unpack_data(self, x):
         return StageInfo(x[0], x[1], x[2], x[3], list(x[5:9]), struct.unpack('f', bytes((x[10], x[11], 0, 0)))[0])
 
 
 class UnpackKmp(Unpacker):
+    MAGIC = 'RKMD'
     unpackers = [UnpackKtpt, UnpackEnpt, UnpackEnph, UnpackItpt, UnpackItph, UnpackCkpt, UnpackCkph,
                  UnpackGobj, UnpackPoti, UnpackArea, UnpackCame, UnpackJgpt, UnpackCnpt, UnpackMspt, UnpackStgi]
+    # sections that must be unpacked and resolved first, routes, cameras, respawns, and the points of each group
+    dependencies = {2: (1,), 4: (3,), 5: (11,), 6: (5,), 7: (8,), 9: (8, 10), 10: (8,)}
 
-    def unpack(self, node, binfile):
+    def __init__(self, node, binfile, lazy=False):
+        self.lazy = lazy
+        super().__init__(node, binfile)
+
+    @classmethod
+    def read_section_table(cls, binfile):
+        """Reads the kmp header, returns the version, the section base offset, and the section offsets"""
         start = binfile.start()
-        if binfile.read_magic() != node.MAGIC:
+        if binfile.read_magic() != cls.MAGIC:
             raise UnpackingError(binfile, 'Not a akmpt file!')
         binfile.read_len()
-        n_sections, head_length, node.version = binfile.read('2HI', 8)
-        if node.version != 0x9d8:
-            raise UnpackingError(binfile, 'Unsupported akmpt version {}'.format(node.version))
-        current = binfile.offset
-        binfile.offset = start + head_length
-        binfile.start()  # Reference from the end of the header
-        binfile.offset = current
-        binfile.store(n_sections)
-        u = []
-        additional_values = []
-        for i in range(n_sections):
-            binfile.recall()
-            unpacker = self.unpackers[i](node, binfile)
-            u.append(unpacker)
-            additional_values.append(unpacker.additional_val)
-        binfile.end()
+        n_sections, head_length, version = binfile.read('2HI', 8)
+        if version != 0x9d8:
+            raise UnpackingError(binfile, 'Unsupported akmpt version {}'.format(version))
+        if n_sections > len(cls.unpackers):
+            raise UnpackingError(binfile, 'Unexpected section count {}'.format(n_sections))
+        offsets = binfile.read('{}I'.format(n_sections), 4 * n_sections)
         binfile.end()
+        return version, start + head_length, offsets
 
-        # post-unpack
-        # routes, respawns, cameras, and the rest can fall in normal order
-        node.additional_values = additional_values
-        post_unpack_order = [8, 10, 11]
-        post_unpack_order.extend([x for x in range(15) if x not in post_unpack_order])
-        for i in post_unpack_order:
-            prev = u[i - 1].nodes if i > 0 else None
-            u[i].post_unpack(prev)
+    def unpack(self, node, binfile):
+        node.version, self.base, self.offsets = self.read_section_table(binfile)
+        node.additional_values = [binfile.read_offset('H', self.base + x + 6)[0] for x in self.offsets]
+        self.sections = [None] * len(self.offsets)
+        self.loaded = set()
+        if not self.lazy:
+            for i in range(len(self.offsets)):
+                self.load(i)
+
+    @property
+    def is_loaded(self):
+        return len(self.loaded) == len(self.offsets)
+
+    def unpack_section(self, i):
+        """Decodes section i (once), without resolving references"""
+        unpacker = self.sections[i]
+        if unpacker is None:
+            profiler = profiling.active
+            start = perf_counter()
+            binfile = self.binfile
+            offset = binfile.offset = self.base + self.offsets[i]
+            unpacker = self.sections[i] = self.unpackers[i](self.node, binfile)
+            if profiler is not None:
+                profiler.record(unpacker.klass.MAGIC, 'unpack', start, unpacker.n_entries, binfile.offset - offset)
+        return unpacker
+
+    def get_section_data(self, i):
+        """Gets the entry count and a memoryview of the packed entries of section i, as in the source"""
+        offset = self.base + self.offsets[i]
+        n_entries = self.binfile.read_offset('H', offset + 4)[0]
+        start = offset + 8
+        end = start + self.unpackers[i].entries_size(self.binfile, start, n_entries)
+        if end > len(self.binfile.file):
+            raise UnpackingError(self.binfile, 'Section {} runs past end of file'.format(i))
+        return n_entries, memoryview(self.binfile.file)[start:end]
+
+    def load(self, i):
+        """Unpacks and resolves section i along with the sections it depends on"""
+        if i in self.loaded:
+            return
+        for x in self.dependencies.get(i, ()):
+            self.load(x)
+        unpacker = self.unpack_section(i)
+        points = self.unpack_section(i - 1).nodes if isinstance(unpacker, UnpackHead) else None
+        start = perf_counter()
+        unpacker.post_unpack(points)
+        if profiling.active is not None:
+            profiling.active.record(unpacker.klass.MAGIC, 'post_unpack', start, unpacker.n_entries, 0)
+        self.loaded.add(i)
@@ -1,4 +1,5 @@
 from akmpt.lib.binfile import UnpackingError
+from akmpt.lib.graph import GroupGraph
 from akmpt.lib.unpack_interface import Unpacker
 
 
@@ -11,28 +12,30 @@ class UnpackSection(Unpacker):
     def resolve(self, items, index):
         return items[index] if 0 <= index < len(items) else None
 
-    def unpack_data(self, binfile):
-        return binfile.read(self.klass.FMT, self.klass.BYTE_LEN)
+    def unpack_data(self, x):
+        """Converts a decoded entry tuple into its node"""
+        return x
+
+    @classmethod
+    def entries_size(cls, binfile, offset, n_entries):
+        """Byte length of the n_entries packed at offset"""
+        return n_entries * cls.klass.BYTE_LEN
+
+    def unpack_entries(self, binfile):
+        unpack_data = self.unpack_data
+        return [unpack_data(x) for x in binfile.read_array(self.klass.FMT, self.n_entries)]
 
     def unpack(self, node, binfile):
         magic = binfile.read_magic()
         if magic != self.klass.MAGIC:
             raise UnpackingError(binfile, 'Wrong section magic {}'.format(magic))
         self.n_entries, self.additional_val = binfile.read('2H', 4)
-        self.nodes = [self.unpack_data(binfile) for i in range(self.n_entries)]
+        self.nodes = self.unpack_entries(binfile)
 
 
 class UnpackHead(UnpackSection):
     def post_unpack(self, args):
         routes = [self.klass(args[x[0]: x[0] + x[1]], list(x[14:])) for x in
                   self.nodes]
-        for j in range(len(routes)):
-            x = self.nodes[j]
-            routes[j].prev_groups = \
-                [routes[x[i]] for i in range(2, 8) if 0 <= x[i] < len(routes)]
-            routes[j].next_groups = \
-                [routes[x[i]] for i in range(8, 14) if 0 <= x[i] < len(routes)]
+        GroupGraph.from_links([(x[2:8], x[8:14]) for x in self.nodes]).apply(routes)
         return routes
-
-    def unpack_data(self, binfile):
-        return binfile.read(self.klass.FMT, 16)
@@ -2,9 +2,11 @@ from akmpt.base import Base
 
 
 class Respawn(Base):
+    __slots__ = ('position', 'rotation', 'range')
     MAGIC = 'JGPT'
     FMT = '6f2H'
     BYTE_LEN = 0x1c
+    FIELDS = (('position', 3), ('rotation', 3), ('index', 1), ('range', 1))
 
     def __init__(self, position=None, rotation=None, range=0):
         self.range = range
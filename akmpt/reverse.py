@@ -1,25 +1,31 @@
 import sys
 
-from akmpt.base import ConnectedPointCollection
-from akmpt.checkpoint import CheckPointGroup
+import numpy as np
+
+from akmpt.base import ConnectedPointCollection, Vector, remove_identical
+from akmpt.checkpoint import CheckPointGroup, get_key_checkpoints
+from akmpt.geometry import closest_points_on_lines, distances, get_y_rotations, move_towards
 from akmpt.kmp import Kmp
-from akmpt.utils import construct_linked_connections, distance, get_y_rotation, get_closest_p_on_line
+from akmpt.utils import construct_linked_connections
 
 
 def reverse_kmp(kmp):
     """Reverses kmp (EXPERIMENTAL, this only gives a starting place)"""
     if type(kmp) == str:
         kmp = Kmp(kmp)
+    key_points = get_key_checkpoints(kmp.check_points)     # reversing moves key checkpoints, not their keys
     for routes in [kmp.check_points, kmp.item_routes, kmp.cpu_routes]:
         for route in routes:
             reverse_route(route, kmp)
+        new_first = move_start_line(kmp) if routes is kmp.check_points else None
         first = routes[0]
-        if len(first.next_groups):
+        if new_first is None and len(first.next_groups):
             new_first = first.next_groups[0]
-            routes.remove(new_first)
+        if new_first is not None and new_first is not first:
+            remove_identical(routes, new_first)
             routes.insert(0, new_first)
     reverse_cpu_offroad_routes(kmp.cpu_routes)
-    reorder_key_checkpoints(kmp.check_points)
+    reorder_key_checkpoints(kmp.check_points, key_points)
     construct_linked_connections(kmp.cpu_routes)
     reverse_respawns(kmp)
     reverse_start(kmp)
@@ -40,52 +46,58 @@ def reverse_cpu_offroad_routes(cpu_routes):
 
 def reverse_start(kmp):
     check_point = kmp.get_start_checkpoint()
-    if not check_point:
+    starts = kmp.start_positions
+    if not check_point or not starts:
         return
-    left_pole = check_point.left_pole
-    right_pole = check_point.right_pole
-
-    for start in kmp.start_positions:
-        mid_point = get_closest_p_on_line((start.position[0], start.position[2]), left_pole, right_pole)
-        v = [start.position[0] - mid_point[0], start.position[2] - mid_point[1]]
-        p = [mid_point[i] + v[i] * -1 for i in range(2)]
-        start.position = [p[0], start.position[1], p[1]]
-        p1, p2 = kmp.get_closest_cpu_pos(start.position)
-        # Move the start position to the closest point on the line created by cpu points
-        start.position = get_closest_p_on_line(start.position, p1.position, p2.position)
-        towards = p2 if p2 in p1.next else p1
-        start.rotation[1] = get_y_rotation(start.position, towards.position)
+    positions = np.array([x.position for x in starts])
+    xz = positions[:, [0, 2]]
+    # mirror the start positions across the start line
+    positions[:, [0, 2]] = 2 * closest_points_on_lines(xz, check_point.left_pole, check_point.right_pole) - xz
+    for start, position in zip(starts, positions.tolist()):
+        start.position = Vector(position)
+    hits = [(x, hit) for x, hit in zip(starts, kmp.get_closest_cpu_segments(positions)) if hit is not None]
+    if not hits:
+        return
+    # Move the start positions to the closest point on the cpu route, facing the end of its segment,
+    # or the next point when at the end already
+    targets = [hit.end.next[0] if hit.t == 1 and getattr(hit.end, 'next', None) else hit.end for x, hit in hits]
+    rotations = get_y_rotations([hit.position for x, hit in hits], [x.position for x in targets])
+    for (start, hit), rotation in zip(hits, rotations.tolist()):
+        start.position = Vector(hit.position)
+        start.rotation[1] = rotation
 
 
 def reverse_respawns(kmp):
-    for respawn in kmp.respawns:
-        p1, p2 = kmp.get_closest_cpu_pos(respawn.position)
-        if p1 in p2.next:
-            move_toward = p1
-        else:  # it might not even be a connected point?
-            move_toward = p2
-        d = 6000
-        while True:
-            d = move_on_line(respawn, move_toward, d)
-            if d <= 0:
-                break
-            move_toward = move_toward.next[0]
-        d = distance(respawn.position, move_toward.position)
-        if d < 500:
-            move_toward = move_toward.next[0]
-        respawn.rotation[1] = get_y_rotation(respawn.position, move_toward.position)
+    hits = kmp.get_closest_cpu_segments([x.position for x in kmp.respawns])
+    respawns = [x for x, hit in zip(kmp.respawns, hits) if hit is not None]
+    if not respawns:
+        return
+    targets = [hit.end for hit in hits if hit is not None]
+    positions = np.array([x.position for x in respawns])
+    move_on_line(positions, targets, 6000)
+    near = distances(positions, [x.position for x in targets]) < 500
+    targets = [x.next[0] if is_near else x for x, is_near in zip(targets, near.tolist())]
+    rotations = get_y_rotations(positions, [x.position for x in targets])
+    for respawn, position, rotation in zip(respawns, positions.tolist(), rotations.tolist()):
+        respawn.position = Vector(position)
+        respawn.rotation[1] = rotation
         respawn.rotation[0] *= -1
         respawn.rotation[2] *= -1
 
 
-def move_on_line(item, point, d):
-    dist = distance(item.position, point.position)
-    if dist > d:
-        item.position = [(point.position[i] - item.position[i]) * d / dist + item.position[i] for i in range(3)]
-        return 0
-    else:  # move full amount
-        item.position = [x for x in point.position]
-        return d - dist
+def move_on_line(positions, targets, d):
+    """Moves positions (N, 3) in place up to d along the cpu routes, toward the points in targets.
+
+    Positions reaching their target continue toward its next point, targets is updated with the points headed to.
+    """
+    remaining = np.full(len(positions), float(d))
+    active = np.arange(len(positions))
+    while len(active):
+        positions[active], remaining[active] = move_towards(positions[active], [targets[i].position for i in active],
+                                                            remaining[active])
+        active = active[remaining[active] > 0]
+        for i in active.tolist():
+            targets[i] = targets[i].next[0]
 
 
 def rotate_group(group):
@@ -93,26 +105,47 @@ def rotate_group(group):
         item.rotation[1] = item.rotation[1] + 180 % 360
 
 
-def reorder_key_checkpoints(checkpoints):
-    key_points = {}  # create map to key checkpoints
-    for group in checkpoints:
-        for x in group:
-            if x.key != 0xff:
-                if x.key in key_points:
-                    key_points[x.key].append(x)
-                else:
-                    key_points[x.key] = [x]
+def reorder_key_checkpoints(checkpoints, key_points=None):
+    """Numbers the key checkpoints in reverse, the start line staying 0.
 
-    key_sorted = sorted(list(key_points.keys()), reverse=True)
+    key_points are the key checkpoints by key, as from get_key_checkpoints, found from checkpoints if not given.
+    """
+    if key_points is None:
+        key_points = get_key_checkpoints(checkpoints)
+    key_sorted = sorted(key_points, reverse=True)
     start_line = key_points[key_sorted[-1]]
     assert start_line and start_line[0].key == 0
-    for i in range(len(key_sorted)):
+    for i in range(len(key_sorted) - 1):
         for key_point in key_points[key_sorted[i]]:
             key_point.key = i + 1
     for item in start_line:
         item.key = 0
 
 
+def move_start_line(kmp):
+    """Moves the start line, last in its group once the checkpoints are reversed, to the start of the next group.
+
+    Returns the group now starting with the start line, None if there is no start line.
+    """
+    for route in kmp.check_points:
+        if len(route) and route[-1].key == 0:
+            break
+    else:
+        return None
+    start_line = route.points.pop(-1)
+    if len(route.next_groups) == 1:
+        next = route.next_groups[0]
+        next.points.insert(0, start_line)
+    else:   # add a new checkpoint group in
+        next = CheckPointGroup([start_line])
+        kmp.check_points.insert(0, next)
+        next.set_next_groups(route.next_groups)
+        route.set_next_groups([next])
+    next.rebuild_pointers()
+    route.rebuild_pointers()
+    return next
+
+
 def reverse_route(route, kmp=None):
     route.points.reverse()
     if issubclass(type(route), ConnectedPointCollection):
@@ -120,16 +153,6 @@ def reverse_route(route, kmp=None):
         route.prev_groups = route.next_groups
         route.next_groups = t
         if type(route) is CheckPointGroup:
-            if route[-1].key == 0:
-                start_line = route.points.pop(-1)
-                if len(route.next_groups) == 1:
-                    next = route.next_groups[0]
-                    next.points.append(start_line)
-                else:   # add a new checkpoint group in
-                    ck_group = CheckPointGroup([start_line])
-                    kmp.check_points.insert(0, ck_group)
-                    ck_group.set_next_groups(route.next_groups)
-                    route.set_next_groups([ck_group])
             for check in route:
                 t = check.left_pole
                 check.left_pole = check.right_pole
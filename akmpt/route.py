@@ -2,9 +2,11 @@ from akmpt.base import Base, PointCollection
 
 
 class Route(PointCollection):
+    __slots__ = ('settings',)
     MAGIC = 'POTI'
     FMT = 'H2B'
     BYTE_LEN = 4
+    FIELDS = (('length', 1), ('settings', 2))
 
     def __init__(self, points=None, settings=None):
         super().__init__(points)
@@ -17,8 +19,10 @@ class Route(PointCollection):
 
 
 class RoutePoint(Base):
+    __slots__ = ('position', 'speed', 'setting')
     FMT = '3f2H'
     BYTE_LEN = 0x10
+    FIELDS = (('position', 3), ('speed', 1), ('setting', 1))
 
     def __init__(self, position=None, speed=0, setting=0):
         [self.position] = self.init_3((position,))
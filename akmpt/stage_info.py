@@ -2,9 +2,12 @@ from akmpt.base import Base
 
 
 class StageInfo(Base):
+    __slots__ = ('lap_count', 'pole_position_right', 'narrow', 'lens_flashing', 'flare_color', 'speed_mod')
     MAGIC = 'STGI'
     FMT = '12B'
     BYTE_LEN = 0xc
+    FIELDS = (('lap_count', 1), ('pole_position_right', 1), ('narrow', 1), ('lens_flashing', 1), ('padding', 1),
+              ('flare_color', 4), ('padding_1', 1), ('speed_mod', 2))
 
     def __init__(self, lap_count=3, pole_position_right=False, narrow=False,
                  lens_flashing=False,
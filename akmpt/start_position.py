@@ -2,9 +2,11 @@ from akmpt.base import Base
 
 
 class StartPosition(Base):
+    __slots__ = ('position', 'rotation', 'player_id')
     MAGIC = 'KTPT'
     FMT = '6f2H'
     BYTE_LEN = 0x1c
+    FIELDS = (('position', 3), ('rotation', 3), ('player_id', 1), ('padding', 1))
 
     def __init__(self, position=None, rotation=None, player_id=0xffff):
         self.position, self.rotation = self.init_3((position, rotation))
@@ -0,0 +1,42 @@
+import numpy as np
+
+from akmpt.kmp import Kmp
+from akmpt.respawn import Respawn
+
+from tests.base import Base
+
+
+class TestArrays(Base):
+    def test_matches_objects(self):
+        kmp = self._get_kmp('casino.kmp')
+        objects = kmp.arrays['GOBJ']
+        self.assertEqual([x.id for x in kmp.game_objects], list(objects['id']))
+        self.assertTrue(np.allclose([x.position for x in kmp.game_objects], objects['position']))
+        points = [x for route in kmp.cpu_routes for x in route]
+        self.assertTrue(np.allclose([x.position for x in points], kmp.arrays.positions('ENPT')))
+
+    def test_reflects_edits(self):
+        kmp = self._get_kmp('beginner.kmp')
+        kmp.respawns[0].position[1] = 1234
+        kmp.respawns.append(Respawn([1, 2, 3]))
+        respawns = kmp.arrays['JGPT']
+        self.assertEqual(2, len(respawns))
+        self.assertEqual(1234, respawns['position'][0][1])
+        low, high = kmp.arrays.bounding_box('JGPT')
+        self.assertTrue(np.allclose([-20115, 2, 3], low))
+
+    def test_clean_sections_read_from_source(self):
+        kmp = Kmp(self._get_test_fname('casino.kmp'), lazy=True)
+        objects = kmp.arrays['GOBJ']
+        self.assertNotIn('game_objects', kmp.__dict__)     # read without unpacking
+        self.assertIs(objects, kmp.arrays['GOBJ'])
+        encoded = kmp.arrays.encode(7)
+        self.assertEqual(objects.tobytes(), encoded.tobytes())
+        kmp.routes.reverse()
+        indices = [getattr(x, 'index', None) for x in kmp.routes]
+        edited = kmp.arrays['GOBJ']    # references a changed section
+        self.assertIsNot(objects, edited)
+        self.assertEqual(indices, [getattr(x, 'index', None) for x in kmp.routes])
+        routes = [id(x) for x in kmp.routes]
+        self.assertEqual([routes.index(id(x.route)) if x.route is not None else 0xffff for x in kmp.game_objects],
+                         list(edited['route']))
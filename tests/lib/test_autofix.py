@@ -0,0 +1,63 @@
+import contextlib
+import io
+
+from akmpt.lib.autofix import AutoFix, MessageReceiver
+from tests.base import Base
+
+
+class TestAutoFix(Base):
+    def setUp(self):
+        self.loudness, self.stream = AutoFix.loudness, AutoFix.stream
+        AutoFix.set_stream(io.StringIO())
+
+    def tearDown(self):
+        AutoFix.flush()
+        AutoFix.loudness = self.loudness
+        AutoFix.set_stream(self.stream)
+
+    def test_lazy_formatting(self):
+        AutoFix.loudness = 3
+        AutoFix.info('{} of {}', 3, 1, 2)
+        AutoFix.info(lambda: 'called')
+        AutoFix.info(lambda: self.fail('rendered below loudness'), 4)
+        AutoFix.flush()
+        self.assertEqual('1 of 2\ncalled\n', AutoFix.stream.getvalue())
+
+    def test_silent(self):
+        AutoFix.loudness = 0
+        AutoFix.info(lambda: self.fail('rendered when silent'), 0)
+        AutoFix.error('{}', 0, 'not shown')
+        AutoFix.flush()
+        self.assertEqual('', AutoFix.stream.getvalue())
+
+    def test_batches_and_flush(self):
+        AutoFix.loudness = 3
+        writes = []
+        write = AutoFix.write
+        AutoFix.write = lambda messages: (writes.append(len(messages)), write(messages))
+        try:
+            for i in range(100):
+                AutoFix.info('{}', 3, i)
+            AutoFix.flush()
+        finally:
+            del AutoFix.write
+        self.assertEqual(''.join(['{}\n'.format(i) for i in range(100)]), AutoFix.stream.getvalue())
+        self.assertEqual(100, sum(writes))
+
+    def test_survives_failing_pipe(self):
+        class Receiver(MessageReceiver):
+            def info(self, message):
+                raise ValueError(message)
+
+        AutoFix.loudness = 3
+        AutoFix.set_pipe(Receiver())
+        try:
+            with contextlib.redirect_stderr(io.StringIO()):
+                AutoFix.info('raised')
+                AutoFix.flush()
+                self.assertTrue(AutoFix.is_running)
+        finally:
+            AutoFix.set_pipe(None)
+        AutoFix.info('after')
+        AutoFix.flush()
+        self.assertEqual('raised\nafter\n', AutoFix.stream.getvalue())
@@ -0,0 +1,84 @@
+import pickle
+
+from akmpt.game_object import GameObject, GameObjectList
+
+from tests.base import Base
+
+ITEM_BOX = 101
+COIN = 115
+
+
+class TestGameObjectIndex(Base):
+    def assertSameObjects(self, expected, objects):
+        self.assertEqual(sorted(map(id, expected)), sorted(map(id, objects)))
+
+    def _check(self, kmp):
+        objects = kmp.game_objects
+        for name in set(x.name for x in objects):
+            self.assertSameObjects([x for x in objects if x.name == name], kmp[name])
+        for id in set(x.id for x in objects):
+            self.assertSameObjects([x for x in objects if x.id == id], kmp[id])
+        index = objects.object_index
+        for route in kmp.routes:
+            self.assertSameObjects([x for x in objects if x.route is route], index.get_by_route(route))
+        self.assertSameObjects([x for x in objects if x.presence & 2], index.get_by_presence(2))
+
+    def test_lookups(self):
+        kmp = self._get_kmp('casino.kmp')
+        self._check(kmp)
+        self.assertEqual(27, len(kmp['itembox']))
+        self.assertEqual(kmp.game_objects[2:5], kmp[slice(2, 5)])
+        with self.assertRaises(KeyError):
+            kmp['no such object']
+        self.assertEqual([], kmp[0xfff])
+        with_route = kmp.game_objects.object_index.select(route=kmp.routes[0])
+        self.assertSameObjects([x for x in kmp.game_objects if x.route is kmp.routes[0]], with_route)
+
+    def test_updated_after_edit(self):
+        kmp = self._get_kmp('casino.kmp')
+        objects = kmp.game_objects
+        box = kmp['itembox'][0]
+        box.id = COIN
+        self.assertNotIn(box, kmp['itembox'])
+        self.assertEqual('coin', box.name)
+        self.assertIn(box, kmp['coin'])
+        objects.remove(box)
+        self.assertFalse(any(x is box for x in kmp['coin']))
+        added = GameObject(COIN, position=[1, 2, 3], route=kmp.routes[1])
+        objects.append(added)
+        objects.insert(0, GameObject(COIN))
+        del objects[1:3]
+        objects[4] = GameObject(COIN)
+        objects.pop(0)
+        self.assertIn(added, objects.object_index.get_by_route(kmp.routes[1]))
+        self._check(kmp)
+        kmp.game_objects = list(objects)
+        self._check(kmp)
+
+    def test_shared_objects(self):
+        kmp = self._get_kmp('casino.kmp')
+        box = kmp['itembox'][0]
+        kmp.game_objects.append(box)    # held twice
+        other = GameObjectList([box])
+        box.id = COIN
+        self.assertIn(box, kmp[COIN])
+        self.assertFalse(any(x is box for x in kmp[ITEM_BOX]))
+        self.assertEqual([box], other.object_index.get_by_id(COIN))
+        kmp.game_objects.remove(box)
+        box.presence = 1
+        self.assertIn(box, kmp.game_objects.object_index.get_by_presence(1))
+        self.assertEqual([box], other.object_index.get_by_presence(1))
+        kmp.game_objects = list(kmp.game_objects)
+        box.presence = 2
+        self.assertIn(box, kmp.game_objects.object_index.get_by_presence(2))
+        self.assertEqual(2, len(box._owners))
+        self._check(kmp)
+
+    def test_pickle(self):
+        kmp = self._get_kmp('casino.kmp')
+        copy = pickle.loads(pickle.dumps(kmp))
+        self.assertEqual(kmp, copy)
+        self._check(copy)
+        copy['coin'][0].id = ITEM_BOX
+        self._check(copy)
+        self._check(kmp)
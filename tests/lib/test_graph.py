@@ -0,0 +1,41 @@
+from akmpt.item_route import ItemRoute, ItemRoutePoint
+from akmpt.lib.graph import GroupGraph
+
+from tests.base import Base
+
+
+class TestGraph(Base):
+    def test_links_round_trip(self):
+        kmp = self._get_kmp('beginner.kmp')
+        groups = kmp.item_routes
+        graph = GroupGraph.from_groups(groups)
+        links = [graph.get_links(i) for i in range(len(graph))]
+        self.assertEqual([[3, 7] + [0xff] * 4, [1, 4] + [0xff] * 4], links[0])
+        copies = [ItemRoute(x.points) for x in groups]
+        GroupGraph.from_links(links).apply(copies)
+        for group, copy in zip(groups, copies):
+            self.assertEqual([groups.index(x) for x in group.next_groups], [copies.index(x) for x in copy.next_groups])
+            self.assertEqual([groups.index(x) for x in group.prev_groups], [copies.index(x) for x in copy.prev_groups])
+
+    def test_components(self):
+        none = [0xff] * 6
+        links = [([2], [1]), ([0], [2]), ([1], [0, 3]), ([2, 3], [3]), (none, none)]
+        graph = GroupGraph.from_links(links)
+        self.assertEqual([[3], [2, 1, 0], [4]], graph.strongly_connected_components())
+        graph.next[2].pop(0)
+        self.assertEqual([[3], [2], [1], [0], [4]], graph.strongly_connected_components())
+        graph.next[4] = dict.fromkeys(range(7))
+        self.assertRaises(ValueError, graph.get_links, 4)
+
+    def test_unlink_identical_groups(self):
+        points = [ItemRoutePoint([0, 0, 0]), ItemRoutePoint([100, 0, 0])]
+        first, second, target = ItemRoute(points), ItemRoute(points), ItemRoute()
+        self.assertEqual(first, second)
+        first.add_next_group(target)
+        second.add_next_group(target)
+        second.remove_next_group(target)
+        self.assertIs(first, target.prev_groups[0])
+        self.assertEqual(1, len(target.prev_groups))
+        second.add_next_group(target)
+        first.set_next_groups([])
+        self.assertEqual([id(second)], [id(x) for x in target.prev_groups])
@@ -1,4 +1,6 @@
 import os
+import shutil
+import tempfile
 
 from tests.base import Base
 from akmpt.kmp import Kmp
@@ -9,6 +11,7 @@ class TestPack(Base):
     def _test_pack_eq(self, fname):
         original = Kmp(self._get_test_fname(fname))
         name = original.name
+        original.close()    # re-encode every section
         original.save(self._get_tmp('kmp'), overwrite=True)
         if not file_compare(name, original.name):
             new = Kmp(original.name)
@@ -20,3 +23,73 @@ class TestPack(Base):
 
     def test_casino_pack_eq(self):
         self._test_pack_eq('casino.kmp')
+
+    def test_lazy_pack_eq(self):
+        original = Kmp(self._get_test_fname('casino.kmp'), lazy=True, memory_map=True)
+        name = original.name
+        self.assertEqual(150, len(original.game_objects))
+        original.save(self._get_tmp('kmp'), overwrite=True)
+        self.assertEqual({7}, original.dirty)
+        self.assertNotIn('cpu_routes', original.__dict__)
+        self.assertTrue(file_compare(name, original.name))
+
+    def test_bytes_round_trip(self):
+        with open(self._get_test_fname('beginner.kmp'), 'rb') as f:
+            data = f.read()
+        kmp = Kmp.from_bytes(data)
+        self.assertIsNone(kmp.name)
+        self.assertEqual(data, kmp.to_bytes())
+
+    def test_save_replaces_atomically(self):
+        kmp = self._get_kmp('beginner.kmp')
+        tmp = self._get_tmp('kmp')
+        with open(tmp, 'wb') as f:
+            f.write(b'partial')
+        self.assertTrue(kmp.save(tmp, overwrite=True, fsync=True))
+        self.assertTrue(file_compare(self._get_test_fname('beginner.kmp'), tmp))
+        self.assertEqual([], [x for x in os.listdir(os.path.dirname(tmp)) if x.endswith('.tmp')])
+
+    def test_save_splices_clean_sections(self):
+        kmp = Kmp(self._get_test_fname('beginner.kmp'), lazy=True)
+        kmp.game_objects[1].rotation[1] = 45
+        kmp.save(self._get_tmp('kmp'), overwrite=True)
+        self.assertEqual({7}, kmp.dirty)
+        self.assertNotIn('cpu_routes', kmp.__dict__)
+        new = Kmp(self.tmp)
+        self.assertEqual(45, new.game_objects[1].rotation[1])
+        kmp.load()
+        self.assertTrue(kmp == new)
+
+    def test_save_reencodes_referencing_sections(self):
+        kmp = Kmp(self._get_test_fname('beginner.kmp'), lazy=True)
+        del kmp.routes[8]
+        kmp.save(self._get_tmp('kmp'), overwrite=True)
+        new = Kmp(self.tmp)
+        self.assertEqual(15, len(new.routes))
+        self.assertTrue(kmp == new)
+
+    def test_save_reencodes_sections_edited_through_references(self):
+        kmp = self._get_kmp('beginner.kmp')
+        kmp.check_points[0][0].respawn.position[0] = 1
+        route = next(x.route for x in kmp.game_objects if x.route is not None)
+        route.points[0].position[1] = 2
+        kmp.save(self._get_tmp('kmp'), overwrite=True)
+        self.assertNotIn(11, kmp.dirty)
+        new = Kmp(self.tmp)
+        self.assertEqual(1, new.check_points[0][0].respawn.position[0])
+        self.assertEqual(2, new.routes[route.index].points[0].position[1])
+        self.assertTrue(kmp == new)
+
+    def test_save_through_symlink(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            target = os.path.join(tmp, 'course.kmp')
+            shutil.copy(self._get_test_fname('casino.kmp'), target)
+            link = os.path.join(tmp, 'link.kmp')
+            try:
+                os.symlink(target, link)
+            except (OSError, NotImplementedError):
+                self.skipTest('symlinks not supported')
+            kmp = self._get_kmp('beginner.kmp')
+            self.assertTrue(kmp.save(link, overwrite=True))
+            self.assertTrue(os.path.islink(link))
+            self.assertTrue(file_compare(self._get_test_fname('beginner.kmp'), target))
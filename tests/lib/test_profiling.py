@@ -0,0 +1,18 @@
+from akmpt.kmp import Kmp
+from akmpt.lib.profiling import profiling
+from tests.base import Base
+
+
+class TestProfiling(Base):
+    def test_section_phases(self):
+        with profiling() as profiler:
+            kmp = Kmp(self._get_test_fname('beginner.kmp'))
+            kmp.game_objects[0].position[0] += 1
+            kmp.to_bytes()
+        summary = profiler.summary()
+        self.assertEqual(61, summary[('GOBJ', 'unpack')][2])
+        self.assertEqual(61 * 0x3c + 8, summary[('GOBJ', 'pack')][3])
+        self.assertEqual(2408, summary[('POTI', 'pack')][3])     # referenced, so possibly edited
+        self.assertEqual(1108, summary[('ENPT', 'copy')][3])
+        self.assertEqual(15, len([x for x in profiler.records if x[1] in ('pack', 'copy')]))
+        self.assertIn('GOBJ    unpack', profiler.format())
@@ -0,0 +1,59 @@
+import random
+
+import numpy as np
+
+from akmpt.cpu_route import CpuRoute, CpuRoutePoint
+from akmpt.geometry import nearest_points
+from akmpt.lib.spatial import get_segments
+
+from tests.base import Base
+
+
+class TestSpatial(Base):
+    def _brute_force(self, segments, point):
+        p = np.array(point)
+        distances = []
+        for start, end in segments:
+            s, d = np.array(start.position), np.subtract(end.position, start.position)
+            t = np.clip(np.dot(p - s, d) / np.dot(d, d), 0, 1) if np.dot(d, d) else 0
+            distances.append(np.linalg.norm(s + t * d - p))
+        return min(distances)
+
+    def test_nearest_matches_brute_force(self):
+        kmp = self._get_kmp('casino.kmp')
+        index = kmp.get_cpu_segment_index()
+        segments = get_segments(kmp.cpu_routes)
+        rng = random.Random(1)
+        for i in range(50):
+            point = [rng.uniform(-60000, 60000), rng.uniform(-2000, 5000), rng.uniform(-60000, 60000)]
+            hit = index.nearest(point)
+            self.assertIn(hit.end, [end for start, end in segments if start is hit.start])
+            self.assertAlmostEqual(self._brute_force(segments, point), hit.distance, places=6)
+
+    def test_batch_matches_single(self):
+        kmp = self._get_kmp('casino.kmp')
+        rng = np.random.RandomState(2)
+        queries = rng.uniform(-30000, 30000, (40, 3))
+        index = kmp.get_cpu_segment_index()
+        for hit, query in zip(kmp.get_closest_cpu_segments(queries), queries):
+            expected = index.nearest(query)
+            self.assertTrue(np.allclose(expected.position, hit.position))
+            self.assertAlmostEqual(expected.distance, hit.distance, places=6)
+        points = kmp.arrays.positions('ENPT')
+        indices, distances = nearest_points(queries, points, chunk_size=100)
+        d = np.linalg.norm(queries[:, None, :] - points[None, :, :], axis=2)
+        self.assertEqual(list(d.argmin(axis=1)), list(indices))
+        self.assertTrue(np.allclose(d.min(axis=1), distances))
+        self.assertEqual(list(indices), list(kmp.arrays.nearest('ENPT', queries)[0]))
+
+    def test_rebuilt_after_edit(self):
+        kmp = self._get_kmp('beginner.kmp')
+        index = kmp.get_cpu_segment_index()
+        self.assertIs(index, kmp.get_cpu_segment_index())
+        self.assertNotIn(2, kmp.dirty)
+        route = CpuRoute([CpuRoutePoint([0, 1e6, 0]), CpuRoutePoint([10, 1e6, 0])])
+        kmp.cpu_routes.append(route)
+        start, end = kmp.get_closest_cpu_pos([5, 1e6, 5])
+        self.assertIs(route[0], start)
+        self.assertIs(route[1], end)
+        self.assertEqual(0.5, kmp.get_closest_cpu_segment([5, 1e6, 5]).t)
@@ -0,0 +1,34 @@
+import struct
+
+from akmpt.lib.binfile import BinFile
+from akmpt.lib.unpacking.structure import KmpStructure
+from tests.base import Base
+
+
+class TestStructure(Base):
+    def _get_structure(self, data):
+        return KmpStructure(BinFile('<buffer>', data=data))
+
+    def _get_data(self, fname='beginner.kmp'):
+        with open(self._get_test_fname(fname), 'rb') as f:
+            return bytearray(f.read())
+
+    def test_valid(self):
+        data = self._get_data()
+        structure = self._get_structure(data)
+        self.assertTrue(structure.is_valid)
+        self.assertEqual(15, len(structure.sections))
+        self.assertEqual(len(data), 0x4c + sum([x.size for x in structure.sections]))
+        self.assertEqual(16, structure.sections[8].n_entries)
+
+    def test_truncated(self):
+        structure = self._get_structure(self._get_data()[:0x2c00])
+        self.assertFalse(structure.is_valid)
+        self.assertIn('Truncated, header length 0x2d08 is past end of file 0x2c00', structure.problems)
+
+    def test_overlap_and_magic(self):
+        data = self._get_data()
+        struct.pack_into('>I', data, 0x10 + 4 * 14, 0x2c88 - 0x4c)     # STGI at JGPT
+        structure = self._get_structure(data)
+        self.assertEqual(["Section 14 at 0x2c88 has magic 'JGPT', expected STGI", 'JGPT overlaps STGI at 0x2c88'],
+                         [x for x in structure.problems if 'STGI' in x])
@@ -1,5 +1,10 @@
+import pickle
+
 import numpy as np
 
+from akmpt.kmp import Kmp
+from akmpt.lib.unpacking.stream import iter_section
+
 from tests.base import Base
 
 
@@ -129,3 +134,47 @@ class TestUnpack(Base):
         self.assertTrue(np.allclose([1, 2, 3], end_pos.position))
         self.assertTrue(np.allclose([4, 5, 6], end_pos.rotation))
         self.assertEqual(6, end_pos.unknown)
+
+    def test_unpack_memory_mapped(self):
+        kmp = Kmp(self._get_test_fname('beginner.kmp'), memory_map=True)
+        self._test_beginner(kmp)
+        self.assertTrue(kmp == self._get_kmp('beginner.kmp'))
+        self.assertIsNone(kmp.unpacker.binfile.mmap)
+
+    def test_eager_load_copies_source(self):
+        with open(self._get_test_fname('beginner.kmp'), 'rb') as f:
+            data = bytearray(f.read())
+        expected = bytes(data)
+        kmp = Kmp.from_bytes(data)
+        data[:] = bytes(len(data))
+        self.assertEqual(expected, bytes(kmp.to_bytes()))
+
+    def test_unpack_lazy(self):
+        kmp = Kmp(self._get_test_fname('beginner.kmp'), lazy=True)
+        self.assertEqual(set(), kmp.unpacker.loaded)
+        self.assertEqual(0x10, len(kmp.game_objects) and len(kmp.routes))
+        self.assertEqual({7, 8}, kmp.unpacker.loaded)
+        self.assertNotIn('cameras', kmp.__dict__)
+        self._test_beginner(kmp)
+        self.assertTrue(kmp.unpacker.is_loaded)
+        kmp.close()
+        self.assertIsNone(kmp.unpacker)
+
+    def test_compact_elements(self):
+        kmp = self._get_kmp('beginner.kmp')
+        obj = kmp.game_objects[0]
+        self.assertFalse(hasattr(obj, '__dict__'))
+        self.assertEqual(list(obj.position), obj.position)
+        self.assertNotEqual(list(obj.rotation) + [0], obj.rotation)
+        self.assertTrue(kmp == pickle.loads(pickle.dumps(kmp)))
+
+    def test_iter_section(self):
+        fname = self._get_test_fname('casino.kmp')
+        kmp = Kmp(fname)
+        ids = [x.id for x in iter_section(fname, 'GOBJ', named=True)]
+        self.assertEqual([x.id for x in kmp.game_objects], ids)
+        with open(fname, 'rb') as f:
+            points = [x[0:3] for x in iter_section(f.read(), 'ENPT')]
+        self.assertEqual([tuple(x.position) for r in kmp.cpu_routes for x in r], points)
+        routes = list(iter_section(fname, 'POTI', named=True))
+        self.assertEqual([len(x) for x in kmp.routes], [route.length for route, points in routes])
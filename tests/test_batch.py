@@ -0,0 +1,62 @@
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+from akmpt.__main__ import RotateRunner
+from akmpt.batch import expand_files
+from akmpt.cmon.cmdline import run_cmds
+from akmpt.kmp import Kmp
+from akmpt.lib.autofix import AutoFix
+from akmpt.reverse import reverse_kmp
+from tests.base import Base
+
+
+class TestBatch(Base):
+    def test_rotate_directory(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            source = os.path.join(tmp, 'in')
+            os.mkdir(source)
+            for name in ('beginner.kmp', 'casino.kmp'):
+                shutil.copy(self._get_test_fname(name), source)
+            destination = os.path.join(tmp, 'out')
+            results = run_cmds(['rotate', os.path.join(source, '*.kmp'), '-d', destination, '--jobs', '2'],
+                               arg_runners=[RotateRunner])
+            self.assertEqual([True], results)
+            original = self._get_kmp('casino.kmp')
+            rotated = Kmp(os.path.join(destination, 'casino.kmp'))
+            self.assertEqual((original.game_objects[0].rotation[1] + 180) % 360, rotated.game_objects[0].rotation[1])
+
+    def test_bracketed_file_name(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            source = os.path.join(tmp, '[DS] beginner.kmp')
+            shutil.copy(self._get_test_fname('beginner.kmp'), source)
+            self.assertIsNone(expand_files(source))
+            destination = os.path.join(tmp, 'out.kmp')
+            results = run_cmds(['rotate', source, destination], arg_runners=[RotateRunner])
+            self.assertEqual([True], results)
+            self.assertTrue(os.path.exists(destination))
+
+    def test_reverse_stdin_to_stdout(self):
+        with open(self._get_test_fname('beginner.kmp'), 'rb') as f:
+            data = f.read()
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        for args in (['-', '-'], ['-', '-d', '-'], [self._get_test_fname('beginner.kmp'), '-']):
+            result = subprocess.run([sys.executable, '-m', 'akmpt', 'reverse'] + args, input=data,
+                                    stdout=subprocess.PIPE, stderr=subprocess.PIPE, cwd=root)
+            self.assertEqual(0, result.returncode, result.stderr)
+            self.assertEqual(reverse_kmp(Kmp.from_bytes(data)).to_bytes(), result.stdout)
+
+    def test_rotate_unknown_item(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            destination = os.path.join(tmp, 'out.kmp')
+            loudness = AutoFix.loudness
+            AutoFix.loudness = 0
+            try:
+                results = run_cmds(['rotate', self._get_test_fname('casino.kmp'), destination, '--item=itembx'],
+                                   arg_runners=[RotateRunner])
+            finally:
+                AutoFix.loudness = loudness
+            self.assertEqual([False], results)
+            self.assertFalse(os.path.exists(destination))
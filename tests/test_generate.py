@@ -0,0 +1,37 @@
+from akmpt.generate import build_check_points, generate_kmp, get_max_counts, MAX_POINTS
+from akmpt.kmp import Kmp
+from akmpt.reverse import reverse_kmp
+from tests.base import Base
+
+
+class TestGenerate(Base):
+    def test_max_round_trip(self):
+        counts = get_max_counts()
+        counts.update(game_objects=1000, areas=1000)
+        data = generate_kmp(**counts).to_bytes()
+        kmp = Kmp.from_bytes(data)
+        self.assertEqual(MAX_POINTS, sum([len(x) for x in kmp.cpu_routes]))
+        self.assertEqual([6] * counts['checkpoint_groups'], [len(x.next_groups) for x in kmp.check_points])
+        self.assertEqual([6] * counts['item_groups'], [len(x.prev_groups) for x in kmp.item_routes])
+        self.assertIs(kmp.routes[0], kmp.game_objects[0].route)
+        self.assertEqual(data, Kmp.from_bytes(data).to_bytes())
+
+    def test_limits(self):
+        with self.assertRaises(ValueError):
+            generate_kmp(cpu_groups=2, cpu_points=128)
+        with self.assertRaises(ValueError):
+            generate_kmp(links=7)
+
+    def test_reverse_generated(self):
+        kmp = Kmp.from_bytes(generate_kmp().to_bytes())
+        reverse_kmp(kmp)
+        self.assertEqual(0, kmp.check_points[0][0].key)
+        data = kmp.to_bytes()
+        self.assertEqual(data, Kmp.from_bytes(data).to_bytes())
+
+    def test_recalc_many_key_checkpoints(self):
+        kmp = Kmp(None, read_file=False)
+        kmp.check_points, kmp.respawns = build_check_points(3000, 1, 2, 20000)   # deeper than the recursion limit
+        key_points = kmp.recalc_key_checkpoints()
+        self.assertEqual(list(range(3000)), [x[0].key for x in kmp.check_points])
+        self.assertIs(kmp.check_points[-1][0], key_points[2999][0])
@@ -0,0 +1,27 @@
+import numpy as np
+
+from akmpt import geometry
+from tests.base import Base
+
+
+class TestGeometry(Base):
+    def test_batch_matches_scalar(self):
+        rng = np.random.RandomState(3)
+        points, starts, ends = rng.uniform(-1000, 1000, (3, 20, 3))
+        lines = geometry.closest_points_on_lines(points, starts, ends)
+        rotations = geometry.get_y_rotations(points, ends)
+        for i in range(len(points)):
+            p, s, e = points[i].tolist(), starts[i].tolist(), ends[i].tolist()
+            self.assertTrue(np.allclose(geometry.closest_point_on_line(p, s, e), lines[i]))
+            self.assertAlmostEqual(geometry.get_y_rotation(p, e), rotations[i])
+            self.assertAlmostEqual(geometry.distance(p, e), geometry.distances(p, e))
+        indices, t, closest, distances = geometry.nearest_segments(points, starts, ends)
+        for i in range(len(points)):
+            best = min(geometry.distance(points[i], geometry.closest_point_on_segment(points[i], s, e)[1])
+                       for s, e in zip(starts, ends))
+            self.assertAlmostEqual(best, distances[i])
+
+    def test_move_towards(self):
+        moved, left = geometry.move_towards([[0, 0, 0], [0, 0, 0]], [[0, 0, 10], [3, 4, 0]], [4, 8])
+        self.assertTrue(np.allclose([[0, 0, 4], [3, 4, 0]], moved))
+        self.assertEqual([0, 3], left.tolist())
@@ -1,4 +1,9 @@
 from akmpt import reverse
+from akmpt.checkpoint import CheckPoint, CheckPointGroup
+from akmpt.cpu_route import CpuRoute, CpuRoutePoint
+from akmpt.kmp import Kmp
+from akmpt.start_position import StartPosition
+from akmpt.utils import construct_linked_connections
 from akmpt.utils import is_ahead, get_y_rotation
 from tests.base import Base
 
@@ -17,3 +22,16 @@ class TestReverse(Base):
         start_pos = reversed.start_positions[0]
         alignment = get_y_rotation(start_pos.position, start_cpu.position)
         self.assertTrue(alignment == start_pos.rotation[1])
+
+    def test_start_faces_next_segment_at_route_end(self):
+        kmp = Kmp(None, read_file=False)
+        kmp.begin()
+        kmp.check_points = [CheckPointGroup([CheckPoint([0, 0], [3000, 0], key=0)])]
+        kmp.cpu_routes = [CpuRoute([CpuRoutePoint([0, 0, 0]), CpuRoutePoint([1000, 0, 0]),
+                                    CpuRoutePoint([2000, 0, 1000])])]
+        construct_linked_connections(kmp.cpu_routes)
+        kmp.start_positions = [StartPosition([1500, 0, 500])]
+        reverse.reverse_start(kmp)
+        start = kmp.start_positions[0]
+        self.assertEqual([1000, 0, 0], start.position)  # clamped to the end of the first segment
+        self.assertAlmostEqual(45, start.rotation[1])